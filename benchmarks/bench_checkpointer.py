@@ -0,0 +1,134 @@
+"""Concurrent-writer benchmark for the module-2 SQLite checkpointers.
+
+Runs `--workers` concurrent chats, each invoking a small three-node
+MessagesState graph `--turns` times on its own thread id, against:
+
+- shared: SqliteSaver on one sqlite3 connection (what sample6.py used)
+- pooled: PooledSqliteSaver, a bounded pool of WAL connections
+- async shared / async pooled: AsyncSqliteSaver on one aiosqlite connection
+  vs PooledAsyncSqliteSaver, with the chats as asyncio tasks
+
+Each node does `--work-ms` of sleep, standing in for a model call, so
+the numbers show how much time the chats spend queued on the checkpointer.
+Reports throughput (turns/s) and per-turn p50 / p95 latency.
+
+Usage:
+    python benchmarks/bench_checkpointer.py
+    python benchmarks/bench_checkpointer.py --workers 16 --turns 50
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, "module-2", "studio"))
+
+import aiosqlite  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.checkpoint.sqlite import SqliteSaver  # noqa: E402
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver  # noqa: E402
+from langgraph.graph import END, START, MessagesState, StateGraph  # noqa: E402
+
+from sqlite_checkpointer import PooledAsyncSqliteSaver, PooledSqliteSaver  # noqa: E402
+
+def build_graph(work_s: float):
+    def respond(state: MessagesState):
+        time.sleep(work_s)
+        return {"messages": [AIMessage(content="Here is a reply of moderate length. " * 20)]}
+
+    async def arespond(state: MessagesState):
+        await asyncio.sleep(work_s)
+        return {"messages": [AIMessage(content="Here is a reply of moderate length. " * 20)]}
+
+    builder = StateGraph(MessagesState)
+    from langchain_core.runnables import RunnableLambda
+    for name in ("first", "second", "third"):
+        builder.add_node(name, RunnableLambda(respond, afunc=arespond))
+    builder.add_edge(START, "first")
+    builder.add_edge("first", "second")
+    builder.add_edge("second", "third")
+    builder.add_edge("third", END)
+    return builder
+
+def message(worker: int, turn: int) -> dict:
+    return {"messages": [HumanMessage(content=f"Worker {worker} turn {turn}: how is it going? " * 5)]}
+
+def run_sync(graph, workers: int, turns: int) -> List[float]:
+    def chat(worker: int) -> List[float]:
+        config = {"configurable": {"thread_id": f"chat-{worker}"}}
+        timings = []
+        for turn in range(turns):
+            start = time.perf_counter()
+            graph.invoke(message(worker, turn), config)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [t for timings in pool.map(chat, range(workers)) for t in timings]
+
+async def run_async(graph, workers: int, turns: int) -> List[float]:
+    async def chat(worker: int) -> List[float]:
+        config = {"configurable": {"thread_id": f"chat-{worker}"}}
+        timings = []
+        for turn in range(turns):
+            start = time.perf_counter()
+            await graph.ainvoke(message(worker, turn), config)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    results = await asyncio.gather(*(chat(worker) for worker in range(workers)))
+    return [t for timings in results for t in timings]
+
+def report(name: str, timings: List[float], elapsed: float) -> None:
+    timings = sorted(timings)
+    print(f"    {name:<14} {len(timings) / elapsed:8.1f} turns/s  "
+          f"p50 {statistics.median(timings) * 1000:8.1f} ms  p95 {timings[int(len(timings) * 0.95) - 1] * 1000:8.1f} ms")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--work-ms", type=float, default=5.0, help="Simulated model time per node")
+    parser.add_argument("--pool-size", type=int, default=4, help="Connections in the async pool")
+    args = parser.parse_args(argv)
+
+    builder = build_graph(args.work_ms / 1000)
+    print(f"{args.workers} concurrent chats x {args.turns} turns, 3 nodes of {args.work_ms:.0f} ms each")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "shared.db"), check_same_thread=False)
+        start = time.perf_counter()
+        timings = run_sync(builder.compile(checkpointer=SqliteSaver(conn)), args.workers, args.turns)
+        report("shared", timings, time.perf_counter() - start)
+        conn.close()
+
+        saver = PooledSqliteSaver.from_path(os.path.join(tmp, "pooled.db"))
+        start = time.perf_counter()
+        timings = run_sync(builder.compile(checkpointer=saver), args.workers, args.turns)
+        report("pooled", timings, time.perf_counter() - start)
+        saver.close()
+
+        async def run_async_savers():
+            async with aiosqlite.connect(os.path.join(tmp, "async_shared.db")) as conn:
+                start = time.perf_counter()
+                timings = await run_async(builder.compile(checkpointer=AsyncSqliteSaver(conn)), args.workers, args.turns)
+                report("async shared", timings, time.perf_counter() - start)
+
+            async with PooledAsyncSqliteSaver.from_path(os.path.join(tmp, "async_pooled.db"), size=args.pool_size) as saver:
+                start = time.perf_counter()
+                timings = await run_async(builder.compile(checkpointer=saver), args.workers, args.turns)
+                report("async pooled", timings, time.perf_counter() - start)
+
+        asyncio.run(run_async_savers())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark for the module-4 retrieval backends, outside of any graph.
+
+Generates a synthetic corpus (Zipf-distributed vocabulary), builds a local BM25
+index over it and times queries against the `local` backend. The `web` and
+`wikipedia` backends are timed with the offline stub search client, so their
+numbers are client overhead only.
+
+Usage:
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --documents 50000 --queries 2000
+    python benchmarks/bench_retrieval.py --corpus ./my_docs
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, "module-4", "studio"))
+
+os.environ.setdefault("SEARCH_BACKEND", "stub")
+
+from local_index import LocalBM25Index  # noqa: E402
+from retrieval import LocalIndexBackend, get_backend  # noqa: E402
+
+def make_corpus(directory: str, documents: int, words: int, vocabulary: int, seed: int = 0) -> List[str]:
+    """Write `documents` text files and return the vocabulary used."""
+
+    rng = random.Random(seed)
+    vocab = [f"term{i}" for i in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    for i in range(documents):
+        text = " ".join(rng.choices(vocab, weights, k=words))
+        with open(os.path.join(directory, f"doc{i:06d}.txt"), "w") as f:
+            f.write(f"Document {i}\n\n{text}\n")
+    return vocab
+
+def time_queries(backend, queries: List[str]) -> dict:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        backend.search(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+        "qps": len(timings) / sum(timings),
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="Index this directory instead of a synthetic corpus")
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--words", type=int, default=300, help="Words per synthetic document")
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = os.path.join(tmp, "corpus")
+            os.makedirs(corpus)
+            vocab = make_corpus(corpus, args.documents, args.words, args.vocabulary)
+        else:
+            vocab = None
+
+        start = time.perf_counter()
+        index = LocalBM25Index.build(corpus, os.path.join(tmp, "index"))
+        build_s = time.perf_counter() - start
+        stats = index.stats()
+        print(f"build      {build_s * 1000:10.1f} ms  {stats['documents']} docs, {stats['terms']} terms, "
+              f"{(stats['postings_bytes'] + stats['documents_bytes']) / 2**20:.1f} MiB on disk")
+
+        if vocab is None:
+            vocab = list(index.terms)
+        queries = [" ".join(rng.choices(vocab, k=rng.randint(3, 8))) for _ in range(args.queries)]
+
+        backends = [("local", LocalIndexBackend(index)), ("web", get_backend("web")), ("wikipedia", get_backend("wikipedia"))]
+        for name, backend in backends:
+            result = time_queries(backend, queries)
+            print(f"{name:<10} p50 {result['p50_ms']:8.3f} ms  p95 {result['p95_ms']:8.3f} ms  {result['qps']:10.0f} q/s")
+        index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark for the SQLite-backed memory store (module-6 sqlite_store.py).
+
+Fills a store with `--items` ToDo-style memories spread over `--users` users
+(namespaces ("todo", category, user)), written with batched puts, then times
+the reads the memory graphs make:
+
+- get: one key
+- search: one user's namespace, first page (what task_mAIstro loads)
+- search filter: one user's namespace with a value filter
+- search prefix: a whole category across users (prefix range scan)
+- list namespaces: users of a category
+
+With --compare-memory the same workload runs against InMemoryStore.
+
+Usage:
+    python benchmarks/bench_store.py                      # 1M items
+    python benchmarks/bench_store.py --items 100000 --compare-memory
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, "module-6", "deployment"))
+
+from langgraph.store.base import PutOp  # noqa: E402
+from langgraph.store.memory import InMemoryStore  # noqa: E402
+
+from sqlite_store import SQLiteStore  # noqa: E402
+
+CATEGORIES = ["general", "work", "personal", "family"]
+STATUSES = ["not started", "in progress", "done", "archived"]
+
+def fill(store, items: int, users: int, batch_size: int) -> float:
+    """Write `items` memories with batched puts; returns items per second."""
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    ops = []
+    for i in range(items):
+        user = i % users
+        namespace = ("todo", CATEGORIES[user % len(CATEGORIES)], f"user-{user}")
+        ops.append(PutOp(namespace, f"item-{i}", {
+            "task": f"Task {i} for user {user}",
+            "time_to_complete": rng.randint(5, 240),
+            "status": rng.choice(STATUSES),
+            "solutions": ["do it"],
+        }))
+        if len(ops) >= batch_size:
+            store.batch(ops)
+            ops = []
+    if ops:
+        store.batch(ops)
+    return items / (time.perf_counter() - start)
+
+def time_calls(call: Callable[[int], object], n: int) -> dict:
+    timings = []
+    for i in range(n):
+        start = time.perf_counter()
+        call(i)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {"p50_ms": statistics.median(timings) * 1000, "p95_ms": timings[int(n * 0.95) - 1] * 1000}
+
+def run(name: str, store, args) -> None:
+    rate = fill(store, args.items, args.users, args.batch_size)
+    print(f"{name}: {args.items} items written at {rate:,.0f} items/s (batches of {args.batch_size})")
+
+    rng = random.Random(1)
+    users = [rng.randrange(args.users) for _ in range(args.queries)]
+    ns = lambda u: ("todo", CATEGORIES[u % len(CATEGORIES)], f"user-{u}")
+    workloads = {
+        "get": lambda i: store.get(ns(users[i]), f"item-{users[i]}"),
+        "search": lambda i: store.search(ns(users[i]), limit=10),
+        "search filter": lambda i: store.search(ns(users[i]), filter={"status": "done"}, limit=10),
+        "search prefix": lambda i: store.search(("todo", CATEGORIES[i % len(CATEGORIES)]), limit=10, offset=users[i] % 100),
+        "list namespaces": lambda i: store.list_namespaces(prefix=("todo", CATEGORIES[i % len(CATEGORIES)]), limit=10),
+    }
+    for workload, call in workloads.items():
+        result = time_calls(call, args.queries)
+        print(f"    {workload:<18} p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--path", help="Database file (default: a temporary file)")
+    parser.add_argument("--compare-memory", action="store_true", help="Also run against InMemoryStore")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path or os.path.join(tmp, "store.db")
+        store = SQLiteStore.from_path(path)
+        run("sqlite", store, args)
+        print(f"    database size {os.path.getsize(path) / 2**20:.1f} MiB")
+        store.close()
+
+    if args.compare_memory:
+        run("memory", InMemoryStore(), args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark for inline vs background summarization in the module-2 chatbot.
+
+Drives module-2 chatbot1.py (the registered `chatbot` graph) with a scripted
+model that sleeps `--latency` seconds per call, so each turn costs one model
+call and a summarizing turn costs two. Reports the per-turn latency seen by
+the caller:
+
+- inline: summarize_conversation runs inside the turn
+- background: turns run through a BackgroundSummarizer, which summarizes
+  after the turn returned
+
+and, for background mode, how many summaries were applied, skipped because
+no longer needed, or dropped because a newer turn got there first.
+
+Usage:
+    python benchmarks/bench_summarization.py
+    python benchmarks/bench_summarization.py --turns 40 --latency 0.1
+"""
+
+import argparse
+import importlib.util
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+STUDIO_DIR = os.path.join(REPO_ROOT, "module-2", "studio")
+sys.path.insert(0, BENCH_DIR)
+
+from fake_llm import scripted_model_factory  # noqa: E402
+
+def load_chatbot(latency: float, turns: int):
+    """Import chatbot1.py with a slow scripted model in place of ChatOpenAI."""
+
+    import langchain_openai
+
+    def reply(messages):
+        time.sleep(latency)
+        return "Sure, here is what I know about that. " * 10
+
+    original = langchain_openai.ChatOpenAI
+    langchain_openai.ChatOpenAI = scripted_model_factory([reply] * (turns * 4))
+    sys.path.insert(0, STUDIO_DIR)
+    try:
+        spec = importlib.util.spec_from_file_location(f"bench_chatbot_{uuid.uuid4().hex[:8]}",
+                                                      os.path.join(STUDIO_DIR, "chatbot1.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        sys.path.remove(STUDIO_DIR)
+        langchain_openai.ChatOpenAI = original
+
+def run_turns(graph, turns: int, summarizer=None) -> List[float]:
+    from langchain_core.messages import HumanMessage
+
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    timings = []
+    for i in range(turns):
+        message = {"messages": [HumanMessage(content=f"Turn {i}: tell me more about the 49ers. " * 5)]}
+        start = time.perf_counter()
+        if summarizer is None:
+            graph.invoke(message, config)
+        else:
+            with summarizer.turn(config) as turn_config:
+                graph.invoke(message, turn_config)
+        timings.append(time.perf_counter() - start)
+    if summarizer is not None:
+        summarizer.join()
+    return timings
+
+def report(name: str, timings: List[float]) -> None:
+    timings = sorted(timings)
+    print(f"    {name:<12} p50 {statistics.median(timings) * 1000:8.1f} ms  "
+          f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:8.1f} ms  "
+          f"mean {statistics.mean(timings) * 1000:8.1f} ms")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per model call")
+    parser.add_argument("--trigger-tokens", type=int, default=150,
+                        help="SUMMARY_TRIGGER_TOKENS; low so most turns summarize")
+    args = parser.parse_args(argv)
+
+    os.environ["SUMMARY_TRIGGER_TOKENS"] = str(args.trigger_tokens)
+    sys.modules.pop("summarization", None)
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    chatbot = load_chatbot(args.latency, args.turns)
+    summarization = sys.modules["summarization"]
+    print(f"{args.turns} turns, {args.latency * 1000:.0f} ms per model call, "
+          f"summary after {args.trigger_tokens} tokens")
+
+    graph = chatbot.workflow.compile(checkpointer=InMemorySaver())
+    report("inline", run_turns(graph, args.turns))
+
+    graph = chatbot.workflow.compile(checkpointer=InMemorySaver())
+    summarizer = summarization.BackgroundSummarizer(graph, chatbot.model)
+    report("background", run_turns(graph, args.turns, summarizer))
+    stats = summarizer.stats()
+    print(f"    background summaries: {stats['applied']} applied, {stats['skipped']} skipped, "
+          f"{stats['conflicts']} dropped on conflict")
+
+if __name__ == "__main__":
+    main()
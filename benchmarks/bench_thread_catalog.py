@@ -0,0 +1,145 @@
+"""Thread listing benchmark for the module-2 thread catalog.
+
+Fills a checkpoint database (LangGraph's SqliteSaver schema) with
+`--checkpoints` checkpoints spread over `--threads` threads and `--users`
+user ids, builds the `threads` catalog from it, and compares:
+
+- distinct: `SELECT DISTINCT thread_id FROM checkpoints`, what
+  list_all_threads in sample6.py ran, returning every thread
+- distinct by user: the same scan filtered on json_extract(metadata, '$.user_id')
+- catalog page: `list_threads` first page, a page `--deep` pages in (walking
+  the cursors), and a page filtered by user_id and by another metadata key
+
+Also reports the backfill time and the cost the catalog triggers add to
+checkpoint inserts.
+
+Usage:
+    python benchmarks/bench_thread_catalog.py
+    python benchmarks/bench_thread_catalog.py --checkpoints 100000 --threads 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import Callable, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, "module-2", "studio"))
+
+from langgraph.checkpoint.sqlite import SqliteSaver  # noqa: E402
+
+from checkpoint_retention import UUID_EPOCH_OFFSET  # noqa: E402
+from thread_catalog import ensure_catalog, list_threads  # noqa: E402
+
+CHECKPOINT_BLOB = b"\x00" * 256
+
+def checkpoint_id(unix_time: float) -> str:
+    """A uuid6 checkpoint id for `unix_time`, like the ones LangGraph generates."""
+
+    timestamp = int(unix_time * 1e7) + UUID_EPOCH_OFFSET
+    value = ((timestamp >> 12) << 80) | (0x6 << 76) | ((timestamp & 0x0FFF) << 64)
+    value |= (0x8 << 60) | random.getrandbits(60)
+    return str(uuid.UUID(int=value))
+
+def rows(checkpoints: int, threads: int, users: int, start: float):
+    for i in range(checkpoints):
+        thread = i % threads
+        metadata = {"source": "loop", "step": i // threads, "parents": {},
+                    "user_id": f"user-{thread % users}", "team": f"team-{thread % 7}"}
+        yield (f"thread-{thread}", "", checkpoint_id(start + i * 0.01), None, "msgpack",
+               CHECKPOINT_BLOB, json.dumps(metadata).encode())
+
+def insert(conn: sqlite3.Connection, batch) -> None:
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+
+def timed(fn: Callable, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def report(name: str, timings: List[float], result: int) -> None:
+    print(f"    {name:<24} p50 {statistics.median(timings) * 1000:10.3f} ms  "
+          f"max {max(timings) * 1000:10.3f} ms  ({result} threads)")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoints", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--deep", type=int, default=100, help="Pages to walk for the deep page")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    random.seed(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "threads.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        SqliteSaver(conn).setup()
+
+        start = time.perf_counter()
+        batch = []
+        for row in rows(args.checkpoints, args.threads, args.users, time.time() - args.checkpoints * 0.01):
+            batch.append(row)
+            if len(batch) == 10_000:
+                insert(conn, batch)
+                batch = []
+        insert(conn, batch)
+        print(f"{args.checkpoints} checkpoints over {args.threads} threads and {args.users} users "
+              f"(filled in {time.perf_counter() - start:.1f} s)")
+
+        start = time.perf_counter()
+        ensure_catalog(conn)
+        print(f"    backfill {time.perf_counter() - start:.2f} s")
+
+        print("listing:")
+        distinct = lambda: conn.execute("SELECT DISTINCT thread_id FROM checkpoints").fetchall()
+        report("distinct", timed(distinct, args.repeat), len(distinct()))
+        by_user = lambda: conn.execute(
+            "SELECT DISTINCT thread_id FROM checkpoints WHERE json_extract(CAST(metadata AS TEXT), '$.user_id') = ?",
+            ("user-7",)).fetchall()
+        report("distinct by user", timed(by_user, args.repeat), len(by_user()))
+
+        first = lambda: list_threads(conn, args.page_size)
+        report("catalog first page", timed(first, args.repeat), len(first().threads))
+        cursor, pages = None, 1
+        while pages <= args.deep:
+            next_cursor = list_threads(conn, args.page_size, cursor).next_cursor
+            if next_cursor is None:
+                break
+            cursor, pages = next_cursor, pages + 1
+        deep = lambda: list_threads(conn, args.page_size, cursor)
+        report(f"catalog page {pages}", timed(deep, args.repeat), len(deep().threads))
+        user = lambda: list_threads(conn, args.page_size, user_id="user-7")
+        report("catalog by user", timed(user, args.repeat), len(user().threads))
+        team = lambda: list_threads(conn, args.page_size, metadata={"team": "team-3"})
+        report("catalog by team", timed(team, args.repeat), len(team().threads))
+
+        # Trigger cost: new checkpoints with the catalog triggers, then without
+        print("inserts (1000 new checkpoints, one transaction each):")
+        for name in ("with catalog", "without catalog"):
+            extra = list(rows(1000, args.threads, args.users, time.time()))
+            start = time.perf_counter()
+            for row in extra:
+                insert(conn, [row])
+            print(f"    {name:<24} {(time.perf_counter() - start) * 1000:10.1f} ms")
+            if name == "with catalog":
+                conn.executescript("DROP TRIGGER threads_on_checkpoint; DROP TRIGGER threads_on_delete;")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark for tool-call capture on Trustcall-shaped run trees.
+
+Compares the old `Spy` (a `with_listeners(on_end=...)` listener that walks the
+finished run tree) with `ToolCallCapture` (module-6 tool_capture.py, a
+callback on chat-model end events). The workload mimics a Trustcall
+extraction that retries patches: `--depth` levels of nested runnables above
+`--attempts` chat model calls, each returning `--calls` PatchDoc tool calls.
+
+Reported per implementation: time per extraction and the Python heap peak
+while it runs.
+
+Usage:
+    python benchmarks/bench_tool_capture.py
+    python benchmarks/bench_tool_capture.py --depth 50 --attempts 20
+"""
+
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, "module-6", "deployment"))
+
+from langchain_core.language_models import GenericFakeChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from tool_capture import ToolCallCapture  # noqa: E402
+
+class LegacySpy:
+    """The run-tree walker the update nodes used before ToolCallCapture."""
+
+    def __init__(self):
+        self.called_tools = []
+
+    def __call__(self, run):
+        q = [run]
+        while q:
+            r = q.pop()
+            if r.child_runs:
+                q.extend(r.child_runs)
+            if r.run_type == "chat_model":
+                self.called_tools.append(
+                    r.outputs["generations"][0][0]["message"]["kwargs"]["tool_calls"]
+                )
+
+def patch_message(calls: int) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{
+        "name": "PatchDoc",
+        "args": {"json_doc_id": f"doc-{i}", "planned_edits": "Update the status " * 20,
+                 "patches": [{"op": "replace", "path": "/status", "value": "in progress"}]},
+        "id": f"call_{i}",
+    } for i in range(calls)])
+
+def build_extraction(depth: int, attempts: int, calls: int):
+    """Nested runnables with `attempts` chat model calls at the bottom."""
+
+    model = GenericFakeChatModel(messages=itertools.repeat(patch_message(calls)))
+
+    def attempt_all(inputs, config):
+        for _ in range(attempts):
+            model.invoke("Patch the ToDo items", config)
+        return inputs
+
+    runnable = RunnableLambda(attempt_all, name="patch")
+    for level in range(depth):
+        runnable = RunnableLambda(lambda inputs, config, inner=runnable: inner.invoke(inputs, config), name=f"level_{level}")
+    return runnable
+
+def measure(run_once, iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        captured = run_once()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run_once()
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"p50_ms": statistics.median(timings) * 1000, "heap_peak_kib": heap_peak / 1024, "captured": captured}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=20, help="Nesting depth of the run tree")
+    parser.add_argument("--attempts", type=int, default=10, help="Chat model calls per extraction")
+    parser.add_argument("--calls", type=int, default=5, help="Tool calls per chat model response")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    extraction = build_extraction(args.depth, args.attempts, args.calls)
+
+    def legacy():
+        spy = LegacySpy()
+        extraction.with_listeners(on_end=spy).invoke({})
+        return sum(len(calls) for calls in spy.called_tools)
+
+    def callback():
+        capture = ToolCallCapture()
+        extraction.invoke({}, config={"callbacks": [capture]})
+        return sum(len(calls) for calls in capture.called_tools)
+
+    print(f"depth {args.depth}, {args.attempts} chat model calls x {args.calls} tool calls")
+    for name, run_once in [("spy (run tree walk)", legacy), ("ToolCallCapture", callback)]:
+        result = measure(run_once, args.iterations)
+        print(f"    {name:<22} p50 {result['p50_ms']:8.2f} ms  heap peak {result['heap_peak_kib']:9.1f} KiB"
+              f"  ({result['captured']} tool calls)")
+
+if __name__ == "__main__":
+    main()
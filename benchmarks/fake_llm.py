@@ -0,0 +1,197 @@
+"""Scripted, zero-latency stand-ins for the providers used by the studio graphs.
+
+The benchmark harness swaps these in for `ChatOpenAI`, `ChatTongyi`,
+`TavilySearch` and `WikipediaLoader` so a graph can be run offline and the
+measured time is framework overhead only.
+"""
+
+import json
+import uuid
+from collections import deque
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Union
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, Field
+
+# A script entry is either a ready message, plain text, or a callable that
+# builds the reply from the prompt messages
+ScriptEntry = Union[AIMessage, str, Callable[[List[BaseMessage]], Union[AIMessage, str]]]
+
+# Length of synthesized lists, so fan-out graphs (analysts, joke subjects) get
+# more than one branch
+FAKE_ARRAY_LENGTH = 3
+
+def fake_value(schema: dict, defs: dict, name: str = "value") -> Any:
+    """Build a deterministic value that validates against a JSON schema."""
+
+    if "$ref" in schema:
+        return fake_value(defs[schema["$ref"].split("/")[-1]], defs, name)
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if s.get("type") != "null"]
+        return fake_value(options[0], defs, name) if options else None
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+
+    kind = schema.get("type", "string")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {key: fake_value(value, defs, key) for key, value in properties.items()}
+    if kind == "array":
+        count = max(schema.get("minItems", 0), FAKE_ARRAY_LENGTH)
+        return [fake_value(schema.get("items", {}), defs, name) for _ in range(count)]
+    if kind == "integer":
+        return 0
+    if kind == "number":
+        return 0.0
+    if kind == "boolean":
+        return False
+    if schema.get("format") == "date-time":
+        return "2024-01-01T00:00:00"
+    return f"fake {name}"
+
+def fake_tool_call(tool: dict) -> dict:
+    """Build a tool call for an OpenAI-format tool with synthesized arguments."""
+
+    function = tool["function"]
+    parameters = function.get("parameters", {})
+    return {
+        "name": function["name"],
+        "args": fake_value(parameters, parameters.get("$defs", {})),
+        "id": f"call_{uuid.uuid4().hex[:12]}",
+        "type": "tool_call",
+    }
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that replays a script and never touches the network.
+
+    Replies come from `script` in order. Once the script is exhausted the model
+    answers deterministically: if a tool choice is forced (structured output,
+    Trustcall) it emits a tool call whose arguments are synthesized from the
+    tool schema, otherwise it returns a short canned text reply.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    model_name: str = "scripted"
+    script: Any = Field(default_factory=deque)
+    reply: str = "This is a scripted reply."
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat-model"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Optional[Any] = None, **kwargs: Any):
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return super().bind(tools=formatted_tools, tool_choice=tool_choice, **kwargs)
+
+    def _next_message(self, messages: List[BaseMessage], tools: Optional[list], tool_choice: Any) -> AIMessage:
+        if self.script:
+            entry = self.script.popleft()
+            if callable(entry):
+                entry = entry(messages)
+            return AIMessage(content=entry) if isinstance(entry, str) else entry
+
+        if tools and tool_choice:
+            forced = [
+                tool for tool in tools
+                if isinstance(tool_choice, str) and tool["function"]["name"] == tool_choice
+            ]
+            return AIMessage(content="", tool_calls=[fake_tool_call((forced or tools)[0])])
+        return AIMessage(content=self.reply)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._next_message(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self._next_message(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        if message.tool_calls or not isinstance(message.content, str):
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=message.content,
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]),
+                     "id": call["id"], "index": i}
+                    for i, call in enumerate(message.tool_calls)
+                ],
+            ))
+            return
+        for token in message.content.split(" "):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+def scripted_model_factory(script: Sequence[ScriptEntry] = ()):
+    """Return a drop-in replacement for a provider class such as `ChatOpenAI`.
+
+    Every model built by the factory shares one script cursor, which matters
+    for graphs that create more than one model at import time.
+    """
+
+    shared = deque(script)
+
+    def factory(*args: Any, model: str = "scripted", **kwargs: Any) -> ScriptedChatModel:
+        # Keep the cache setting so cached runs can be benchmarked too
+        return ScriptedChatModel(model_name=model, script=shared, cache=kwargs.get("cache"))
+
+    return factory
+
+class FakeTavilySearch:
+    """Offline replacement for `langchain_tavily.TavilySearch`."""
+
+    def __init__(self, max_results: int = 3, **kwargs: Any):
+        self.max_results = max_results
+
+    def invoke(self, payload: dict, config: Optional[dict] = None) -> dict:
+        query = payload["query"] if isinstance(payload, dict) else str(payload)
+        return {
+            "query": query,
+            "results": [
+                {"url": f"https://example.com/{i}", "title": f"Result {i}",
+                 "content": f"Offline result {i} for {query}."}
+                for i in range(self.max_results)
+            ],
+        }
+
+    async def ainvoke(self, payload: dict, config: Optional[dict] = None) -> dict:
+        return self.invoke(payload, config)
+
+class FakeWikipediaLoader:
+    """Offline replacement for `WikipediaLoader`."""
+
+    def __init__(self, query: str, load_max_docs: int = 2, **kwargs: Any):
+        self.query = query
+        self.load_max_docs = load_max_docs
+
+    def load(self) -> List[Document]:
+        return [
+            Document(page_content=f"Offline wikipedia page {i} about {self.query}.",
+                     metadata={"source": f"https://en.wikipedia.org/wiki/Page_{i}", "title": f"Page {i}"})
+            for i in range(self.load_max_docs)
+        ]
+
+    async def aload(self) -> List[Document]:
+        return self.load()
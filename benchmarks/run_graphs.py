@@ -0,0 +1,331 @@
+"""Offline benchmark for every graph registered in the studio `langgraph.json` files.
+
+Each graph is imported with `ChatOpenAI` / `ChatTongyi` replaced by a scripted,
+zero-latency chat model and with Tavily / Wikipedia replaced by offline stubs
+(the `stub` backend of module-4's search_clients), so the numbers reflect
+LangGraph and node overhead only.
+
+Graphs in VARIANTS are also run with other config["configurable"] settings
+(map_reduce with joke micro-batching on).
+
+Reported per graph:
+- wall time of the whole run and of every node (summed over calls)
+- number of supersteps (root checkpoints) and total checkpoints written
+- bytes written to the checkpointer (checkpoints + pending writes)
+- peak RSS: ru_maxrss is the high-water mark of the whole process, so it is
+  reported as cumulative (the peak over this graph and every graph run
+  before it) next to how much this graph raised it; run a single graph with
+  --graph for its own peak
+- with --trace-memory, the Python heap peak of the graph's runs
+
+Usage:
+    python benchmarks/run_graphs.py
+    python benchmarks/run_graphs.py --graph research_assistant --iterations 5
+    python benchmarks/run_graphs.py --json bench_output.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.store.memory import InMemoryStore
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_llm import FakeTavilySearch, FakeWikipediaLoader, scripted_model_factory  # noqa: E402
+
+# Studio directories that register graphs
+STUDIO_DIRS = [
+    "module-1/studio",
+    "module-2/studio",
+    "module-3/studio",
+    "module-4/studio",
+    "module-5/studio",
+    "module-6/deployment",
+]
+
+# Per-graph inputs. Each entry lists the inputs passed to successive invoke()
+# calls on the same thread, so graphs that interrupt can be resumed with None.
+SCENARIOS: Dict[str, List[Any]] = {
+    "simple_graph": [{"graph_state": "Hi, this is Lance."}],
+    "sample": [{"name": "John"}],
+    "dynamic_breakpoints": [{"input": "hello"}],
+    "parallelization": [{"question": "How were Nvidia's Q2 2024 earnings?"}],
+    "sub_graphs": [{"raw_logs": [
+        {"id": "1", "question": "How can I import ChatOllama?", "answer": "Use langchain_community.", "docs": None},
+        {"id": "2", "question": "How can I use Chroma vector store?", "answer": "Use Chroma.", "docs": None,
+         "grade": 0, "grader": "Document Relevance Recall", "feedback": "Off-topic docs."},
+    ]}],
+    "map_reduce": [{"topic": "animals"}],
+    "research_assistant": [{"topic": "The benefits of adopting LangGraph as an agent framework", "max_analysts": 3}, None],
+}
+SCENARIOS["research_assistant_async"] = SCENARIOS["research_assistant"]
+DEFAULT_INPUT = [{"messages": [HumanMessage(content="Hi, I'm Lance. Please add a ToDo to book swim lessons.")]}]
+
+# Graphs with async nodes, which are driven with ainvoke()
+ASYNC_GRAPHS = {"research_assistant_async"}
+
+# Extra runs of a graph with other config["configurable"] settings:
+# benchmark id -> (graph id, configurable)
+VARIANTS: Dict[str, tuple] = {
+    # Joke micro-batching: a batch the three jokes fill, and one that waits for the flush
+    "map_reduce[batch=3]": ("map_reduce", {"joke_batch_size": 3}),
+    "map_reduce[batch=8]": ("map_reduce", {"joke_batch_size": 8}),
+}
+
+class CountingSaver(InMemorySaver):
+    """In-memory checkpointer that records how much it is asked to persist."""
+
+    def __init__(self):
+        # Graph modules are imported under generated names, so allow any
+        # module when state (e.g. the Analyst model) is read back
+        super().__init__(serde=JsonPlusSerializer(allowed_msgpack_modules=True))
+        self.checkpoints = 0
+        self.root_checkpoints = 0
+        self.bytes_written = 0
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        self.checkpoints += 1
+        if not config["configurable"].get("checkpoint_ns"):
+            self.root_checkpoints += 1
+        self.bytes_written += len(self.serde.dumps_typed(checkpoint)[1])
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self.bytes_written += sum(len(self.serde.dumps_typed(value)[1]) for _, value in writes)
+        return super().put_writes(config, writes, task_id, task_path)
+
+class NodeTimer(BaseCallbackHandler):
+    """Callback handler that accumulates wall time per graph node."""
+
+    def __init__(self):
+        self.started: Dict[uuid.UUID, tuple] = {}
+        self.totals: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, name=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run carries the node name, not its children;
+        # skip the synthetic __start__ node of nested graphs
+        if node is not None and name == node and not node.startswith("__"):
+            self.started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def _finish(self, run_id):
+        started = self.started.pop(run_id, None)
+        if started is not None:
+            node, start = started
+            self.totals[node] += time.perf_counter() - start
+            self.calls[node] += 1
+
+def discover_graphs(studio_dirs: List[str]) -> List[dict]:
+    """Read every langgraph.json and return the graphs it registers."""
+
+    graphs = []
+    for studio_dir in studio_dirs:
+        config_path = os.path.join(REPO_ROOT, studio_dir, "langgraph.json")
+        with open(config_path) as f:
+            config = json.load(f)
+        for graph_id, target in config["graphs"].items():
+            path, attr = target.split(":")
+            graphs.append({
+                "id": graph_id,
+                "studio_dir": os.path.join(REPO_ROOT, studio_dir),
+                "path": os.path.normpath(os.path.join(REPO_ROOT, studio_dir, path)),
+                "attr": attr,
+            })
+    return graphs
+
+@contextlib.contextmanager
+def offline_providers():
+    """Swap the provider classes for offline fakes while graph modules import them."""
+
+    import langchain_community.chat_models as community_chat_models
+    import langchain_community.document_loaders as community_loaders
+    import langchain_openai
+    import langchain_tavily
+
+    factory = scripted_model_factory()
+    patches = [
+        (langchain_openai, "ChatOpenAI", factory),
+        (community_chat_models, "ChatTongyi", factory),
+        (langchain_tavily, "TavilySearch", FakeTavilySearch),
+        (community_loaders, "WikipediaLoader", FakeWikipediaLoader),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, replacement in patches:
+        setattr(module, name, replacement)
+    try:
+        # Graphs that search through search_clients use its offline backend
+        with mock.patch.dict(os.environ, {"SEARCH_BACKEND": "stub"}):
+            yield
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+
+def load_graph(spec: dict):
+    """Import a graph module from its studio directory under a unique name."""
+
+    # Studio directories ship sibling helpers with the same name (configuration.py)
+    sys.modules.pop("configuration", None)
+    sys.path.insert(0, spec["studio_dir"])
+    try:
+        module_name = f"bench_{spec['id']}_{uuid.uuid4().hex[:8]}"
+        module_spec = importlib.util.spec_from_file_location(module_name, spec["path"])
+        module = importlib.util.module_from_spec(module_spec)
+        sys.modules[module_name] = module
+        module_spec.loader.exec_module(module)
+        return getattr(module, spec["attr"])
+    finally:
+        sys.path.remove(spec["studio_dir"])
+
+def run_graph(graph, inputs: List[Any], use_async: bool = False, configurable: Optional[dict] = None) -> dict:
+    """Run one scenario against a fresh checkpointer and store."""
+
+    saver = CountingSaver()
+    timer = NodeTimer()
+    graph = graph.copy(update={"checkpointer": saver, "store": InMemoryStore()})
+    config = {"configurable": {"thread_id": str(uuid.uuid4()), **(configurable or {})},
+              "callbacks": [timer], "recursion_limit": 100}
+
+    start = time.perf_counter()
+    if use_async:
+        async def run():
+            for graph_input in inputs:
+                await graph.ainvoke(graph_input, config)
+        asyncio.run(run())
+    else:
+        for graph_input in inputs:
+            graph.invoke(graph_input, config)
+    wall_time = time.perf_counter() - start
+
+    return {
+        "wall_time_s": wall_time,
+        "supersteps": saver.root_checkpoints,
+        "checkpoints": saver.checkpoints,
+        "checkpoint_bytes": saver.bytes_written,
+        "nodes": {node: {"calls": timer.calls[node], "time_s": timer.totals[node]} for node in timer.totals},
+    }
+
+def peak_rss_mb() -> float:
+    """High-water mark of the process RSS so far (ru_maxrss is in KiB on Linux)."""
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def benchmark(spec: dict, iterations: int, trace_memory: bool, verbose: bool,
+              configurable: Optional[dict] = None) -> dict:
+    """Load a graph offline and run its scenario `iterations` times."""
+
+    rss_before = peak_rss_mb()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with offline_providers(), output:
+        graph = load_graph(spec)
+        inputs = SCENARIOS.get(spec["id"], DEFAULT_INPUT)
+        if trace_memory:
+            tracemalloc.start()
+        runs = [run_graph(graph, inputs, spec["id"] in ASYNC_GRAPHS, configurable) for _ in range(iterations)]
+        heap_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    result = runs[-1]
+    result["wall_time_s"] = statistics.median(run["wall_time_s"] for run in runs)
+    result["iterations"] = iterations
+    result["cumulative_peak_rss_mb"] = peak_rss_mb()
+    result["peak_rss_growth_mb"] = result["cumulative_peak_rss_mb"] - rss_before
+    result["heap_peak_mb"] = heap_peak / 2**20 if heap_peak is not None else None
+    return result
+
+def print_report(results: Dict[str, dict]) -> None:
+    print(f"{'graph':<28}{'wall ms':>10}{'steps':>8}{'ckpts':>8}{'ckpt KiB':>10}{'peak MiB*':>11}{'+MiB':>8}")
+    for graph_id, result in results.items():
+        if "error" in result:
+            print(f"{graph_id:<28}  ERROR: {result['error']}")
+            continue
+        print(f"{graph_id:<28}{result['wall_time_s'] * 1000:>10.2f}{result['supersteps']:>8}"
+              f"{result['checkpoints']:>8}{result['checkpoint_bytes'] / 1024:>10.1f}"
+              f"{result['cumulative_peak_rss_mb']:>11.1f}{result['peak_rss_growth_mb']:>8.1f}")
+        for node, stats in sorted(result["nodes"].items(), key=lambda item: -item[1]["time_s"]):
+            print(f"    {node:<24}{stats['time_s'] * 1000:>10.2f} ms  x{stats['calls']}")
+    print("* process RSS high-water mark, cumulative over the graphs run so far; "
+          "+MiB is how much this graph raised it")
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, dict]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--graph", action="append", help="Only run these graph ids (repeatable)")
+    parser.add_argument("--iterations", type=int, default=3, help="Runs per graph; wall time is the median")
+    parser.add_argument("--trace-memory", action="store_true", help="Also record the Python heap peak (slower)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show output printed by the graphs")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for spec in discover_graphs(STUDIO_DIRS):
+        if args.graph and spec["id"] not in args.graph:
+            continue
+        runs = [(spec["id"], None)] + [(name, configurable) for name, (graph_id, configurable) in VARIANTS.items()
+                                       if graph_id == spec["id"]]
+        for name, configurable in runs:
+            try:
+                results[name] = benchmark(spec, args.iterations, args.trace_memory, args.verbose, configurable)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+
+    print_report(results)
+
+    # Studio helpers are imported by bare name, so every graph shares one registry
+    structured = sys.modules.get("structured_output")
+    if structured is not None:
+        stats = structured.structured_output_registry.stats()
+        print(f"\nstructured output: {stats['runnables']} runnables built in {stats['build_ms']:.2f} ms, "
+              f"reused x{stats['hits']} saving ~{stats['saved_ms']:.2f} ms")
+
+    batching = sys.modules.get("store_batching")
+    if batching is not None:
+        stats = batching.write_stats.stats()
+        print(f"store writes: {stats['writes']} in {stats['batches']} batches "
+              f"({stats['writes_per_batch']:.1f} per batch, max {stats['max_batch']})")
+
+    loader = sys.modules.get("memory_loader")
+    if loader is not None:
+        stats = loader.memory_cache.stats()
+        print(f"memory reads: {stats['misses']} namespaces in {stats['round_trips']} round trips, "
+              f"{stats['hits']} served from the run cache")
+
+    search = sys.modules.get("memory_search")
+    if search is not None:
+        stats = search.search_stats.stats()
+        print(f"memory searches: {stats['store_ranked']} ranked by the store, "
+              f"{stats['locally_ranked']} ranked locally (no vector index)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
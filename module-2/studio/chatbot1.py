@@ -1,16 +1,20 @@
 from typing import Literal
 from typing import Literal
-from langchain_core.messages import HumanMessage, SystemMessage, RemoveMessage
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import MessagesState
 from langgraph.graph import StateGraph, START, END
 
+from summarization import needs_summary, summarize_inline, summary_prompt, summary_update
+
 # We will use this model for both the conversation and the summarization
 from langchain_openai import ChatOpenAI
 model = ChatOpenAI(model="gpt-4o", temperature=0) 
 
-# State class to store messages and summary
+# State class to store messages, summary and the id of the last summarized message
 class State(MessagesState):
     summary: str
+    summarized_through: str
     
 # Define the logic to call the model
 def call_model(state: State):
@@ -34,14 +38,13 @@ def call_model(state: State):
     return {"messages": response}
 
 # Determine whether to end or summarize the conversation
-def should_continue(state: State) -> Literal["summarize_conversation", "__end__"]:
+def should_continue(state: State, config: RunnableConfig) -> Literal["summarize_conversation", "__end__"]:
     
     """Return the next node to execute."""
     
-    messages = state["messages"]
-    
-    # If there are more than six messages, then we summarize the conversation
-    if len(messages) > 6:
+    # If the messages since the last summary exceed the token budget, then we summarize them,
+    # unless a BackgroundSummarizer does it after the response
+    if summarize_inline(config) and needs_summary(state):
         return "summarize_conversation"
     
     # Otherwise we can just end
@@ -49,29 +52,11 @@ def should_continue(state: State) -> Literal["summarize_conversation", "__end__"
 
 def summarize_conversation(state: State):
     
-    # First get the summary if it exists
-    summary = state.get("summary", "")
-
-    # Create our summarization prompt 
-    if summary:
-        
-        # If a summary already exists, add it to the prompt
-        summary_message = (
-            f"This is summary of the conversation to date: {summary}\n\n"
-            "Extend the summary by taking into account the new messages above:"
-        )
-        
-    else:
-        # If no summary exists, just create a new one
-        summary_message = "Create a summary of the conversation above:"
-
-    # Add prompt to our history
-    messages = state["messages"] + [HumanMessage(content=summary_message)]
-    response = model.invoke(messages)
+    # Summarize only the messages added since the last summary, extending it if it exists
+    response = model.invoke(summary_prompt(state))
     
-    # Delete all but the 2 most recent messages and add our summary to the state 
-    delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
-    return {"summary": response.content, "messages": delete_messages}
+    # Delete all but the 2 most recent messages, add our summary and move the watermark
+    return summary_update(state, response.content)
 
 # Define a new graph
 workflow = StateGraph(State)
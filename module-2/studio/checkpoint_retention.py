@@ -0,0 +1,317 @@
+"""Retention and compaction for the SQLite checkpoint database (state_db/example.db).
+
+SqliteSaver writes a checkpoint (plus its pending writes) on every superstep
+of every thread and never removes anything, so the database grows without
+bound. `apply_retention` trims it:
+
+- keeps the last `keep_last` checkpoints of every thread (per checkpoint
+  namespace, so subgraph histories are trimmed the same way) and deletes the
+  older ones with their writes
+- deletes idle threads entirely: threads whose newest checkpoint is older
+  than `ttl_seconds`. Checkpoint ids are time-ordered uuid6 values, so the
+  age is read from the id itself, without deserializing the checkpoint
+- deletes in batches of `batch_size` rows, one short transaction per batch, so
+  a live chat server writing to the same file is never blocked for long
+- reclaims the freed pages with incremental VACUUM (`vacuum_pages` at a time)
+  and truncates the WAL, so the file actually shrinks. Incremental VACUUM only
+  works once the database is in auto_vacuum=INCREMENTAL mode, which a
+  database created by SqliteSaver is not: run once with
+  `enable_incremental_vacuum` (--enable-incremental-vacuum) to switch it.
+  Until then the freed pages are only reused, and the CLI says so
+
+The returned report counts what was deleted and how many bytes the database
+(main file + WAL) gave back.
+
+Usage:
+
+    python checkpoint_retention.py --keep-last 20 --ttl-days 30
+    python checkpoint_retention.py --dry-run --json
+    python checkpoint_retention.py --enable-incremental-vacuum   # once, runs a full VACUUM
+
+or from code:
+
+    with memory.connection() as conn:
+        report = apply_retention(conn, keep_last=20, ttl_seconds=30 * 86400)
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# Offset between the uuid6 epoch (1582-10-15) and the Unix epoch, in 100 ns
+UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+DEFAULT_KEEP_LAST = 20
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_VACUUM_PAGES = 1000
+
+# sqlite3 caps the number of bound parameters per statement
+MAX_PARAMS = 900
+
+def default_db_path() -> str:
+    # Same location as module-2/studio/sample6.py: <repo>/state_db/example.db
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(os.path.dirname(os.path.dirname(current_dir)), "state_db", "example.db")
+
+def checkpoint_time(checkpoint_id: str) -> Optional[float]:
+    """Unix time encoded in a uuid6 checkpoint id, or None for other ids."""
+
+    try:
+        value = uuid.UUID(checkpoint_id)
+    except ValueError:
+        return None
+    if value.version != 6:
+        return None
+    i = value.int
+    timestamp = ((i >> 96) << 28) | (((i >> 80) & 0xFFFF) << 12) | ((i >> 64) & 0x0FFF)
+    return (timestamp - UUID_EPOCH_OFFSET) / 1e7
+
+def database_bytes(conn: sqlite3.Connection) -> int:
+    """Size of the main database file plus its WAL."""
+
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    if not path:
+        return 0
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+def _chunks(rows: Sequence, size: int) -> Iterable[Sequence]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def _delete_checkpoints(conn: sqlite3.Connection, keys: List[Tuple[str, str, str]]) -> Tuple[int, int]:
+    """Delete (thread_id, checkpoint_ns, checkpoint_id) checkpoints and their writes in one transaction."""
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        writes = conn.executemany(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", keys).rowcount
+        checkpoints = conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", keys).rowcount
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return checkpoints, writes
+
+def _still_expired_sql(count: int) -> str:
+    placeholders = ",".join("?" * count)
+    return f"""SELECT thread_id FROM checkpoints WHERE thread_id IN ({placeholders})
+               GROUP BY thread_id HAVING checkpoint_time(MAX(checkpoint_id)) < ?"""
+
+def _delete_threads(conn: sqlite3.Connection, thread_ids: Sequence[str], cutoff: float) -> Tuple[List[str], int, int]:
+    """Delete whole threads in one transaction, if their newest checkpoint is still older than `cutoff`.
+
+    A thread that got a new checkpoint since `expired_threads` picked it is
+    left alone. Returns the deleted thread ids and the checkpoints and writes
+    deleted.
+    """
+
+    conn.create_function("checkpoint_time", 1, checkpoint_time, deterministic=True)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-checked under the write lock, so no checkpoint can land in between
+        expired = [row[0] for row in conn.execute(_still_expired_sql(len(thread_ids)), [*thread_ids, cutoff])]
+        checkpoints = writes = 0
+        if expired:
+            placeholders = ",".join("?" * len(expired))
+            writes = conn.execute(f"DELETE FROM writes WHERE thread_id IN ({placeholders})", expired).rowcount
+            checkpoints = conn.execute(f"DELETE FROM checkpoints WHERE thread_id IN ({placeholders})", expired).rowcount
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return expired, checkpoints, writes
+
+def expired_threads(conn: sqlite3.Connection, ttl_seconds: float, now: Optional[float] = None) -> List[str]:
+    """Threads whose newest checkpoint is older than `ttl_seconds`."""
+
+    return _expired_before(conn, (now if now is not None else time.time()) - ttl_seconds)
+
+def _expired_before(conn: sqlite3.Connection, cutoff: float) -> List[str]:
+    expired = []
+    # One pass over the primary key index, which leads with thread_id
+    for thread_id, newest in conn.execute("SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"):
+        created = checkpoint_time(newest)
+        if created is not None and created < cutoff:
+            expired.append(thread_id)
+    return expired
+
+def stale_checkpoints(conn: sqlite3.Connection, keep_last: int, skip_threads: Iterable[str] = ()) -> Iterable[Tuple[str, str, str]]:
+    """Checkpoints beyond the newest `keep_last` of each thread and namespace.
+
+    Each thread's rows are fetched before they are yielded, so the caller may
+    delete between items.
+    """
+
+    skip = set(skip_threads)
+    histories = conn.execute("SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints").fetchall()
+    for thread_id, checkpoint_ns in histories:
+        if thread_id in skip:
+            continue
+        rows = conn.execute(
+            """SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+               ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?""",
+            (thread_id, checkpoint_ns, keep_last),
+        ).fetchall()
+        for (checkpoint_id,) in rows:
+            yield thread_id, checkpoint_ns, checkpoint_id
+
+def vacuum(conn: sqlite3.Connection, pages: Optional[int] = DEFAULT_VACUUM_PAGES, enable_incremental: bool = False) -> str:
+    """Return free pages to the file system; returns the mode that was used.
+
+    Incremental VACUUM needs auto_vacuum=INCREMENTAL, which an existing
+    database only picks up through one full VACUUM (`enable_incremental`).
+    Without it ("none", the SQLite default auto_vacuum=NONE) nothing is
+    returned: the freed pages stay in the file and are reused by new writes.
+    """
+
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode == 1 and not enable_incremental:
+        # auto_vacuum=FULL already truncates the file at every commit
+        used = "auto"
+    elif mode != 2 and enable_incremental:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        used = "full"
+    elif mode == 2:
+        # execute() would step the pragma once, freeing a single page;
+        # executescript runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});" if pages else "PRAGMA incremental_vacuum;")
+        used = "incremental"
+    else:
+        used = "none"
+    # Fold the WAL back into the database and truncate it
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return used
+
+def _flush(conn: sqlite3.Connection, keys: List[Tuple[str, str, str]], report: dict, dry_run: bool) -> None:
+    if dry_run:
+        report["checkpoints_deleted"] += len(keys)
+        return
+    checkpoints, writes = _delete_checkpoints(conn, keys)
+    report["checkpoints_deleted"] += checkpoints
+    report["writes_deleted"] += writes
+    report["batches"] += 1
+
+def apply_retention(
+    conn: sqlite3.Connection,
+    keep_last: Optional[int] = DEFAULT_KEEP_LAST,
+    ttl_seconds: Optional[float] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    vacuum_pages: Optional[int] = DEFAULT_VACUUM_PAGES,
+    enable_incremental_vacuum: bool = False,
+    dry_run: bool = False,
+) -> dict:
+    """Apply the retention policy to a checkpoint database and report what it reclaimed."""
+
+    start = time.perf_counter()
+    bytes_before = database_bytes(conn)
+    report = {
+        "threads_expired": 0,
+        "checkpoints_deleted": 0,
+        "writes_deleted": 0,
+        "batches": 0,
+        "dry_run": dry_run,
+    }
+    # Deletes are committed batch by batch, outside Python's implicit transactions
+    isolation_level, conn.isolation_level = conn.isolation_level, None
+    try:
+        cutoff = time.time() - ttl_seconds if ttl_seconds is not None else None
+        expired = _expired_before(conn, cutoff) if cutoff is not None else []
+        deleted_threads: List[str] = []
+        # One id per thread plus the cutoff must fit in the bound parameters
+        for thread_ids in _chunks(expired, min(batch_size, MAX_PARAMS - 1)):
+            if dry_run:
+                placeholders = ",".join("?" * len(thread_ids))
+                report["checkpoints_deleted"] += conn.execute(
+                    f"SELECT COUNT(*) FROM checkpoints WHERE thread_id IN ({placeholders})", thread_ids).fetchone()[0]
+                deleted_threads.extend(thread_ids)
+                continue
+            deleted, checkpoints, writes = _delete_threads(conn, thread_ids, cutoff)
+            deleted_threads.extend(deleted)
+            report["checkpoints_deleted"] += checkpoints
+            report["writes_deleted"] += writes
+            report["batches"] += 1
+        report["threads_expired"] = len(deleted_threads)
+
+        if keep_last is not None:
+            # stale_checkpoints holds no open cursor between threads, so each
+            # batch is deleted as soon as it is full
+            keys: List[Tuple[str, str, str]] = []
+            # Threads that became active again are trimmed like any other
+            for key in stale_checkpoints(conn, keep_last, skip_threads=deleted_threads):
+                keys.append(key)
+                if len(keys) >= batch_size:
+                    _flush(conn, keys, report, dry_run)
+                    keys = []
+            if keys:
+                _flush(conn, keys, report, dry_run)
+
+        report["vacuum"] = "none" if dry_run else vacuum(conn, vacuum_pages, enable_incremental_vacuum)
+    finally:
+        conn.isolation_level = isolation_level
+
+    bytes_after = database_bytes(conn)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    report.update({
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_reclaimed": bytes_before - bytes_after,
+        "free_bytes": conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+        "elapsed_s": time.perf_counter() - start,
+    })
+    return report
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=default_db_path(), help="Checkpoint database (default: state_db/example.db)")
+    parser.add_argument("--keep-last", type=int, default=DEFAULT_KEEP_LAST,
+                        help="Checkpoints kept per thread; 0 keeps none, -1 disables trimming")
+    parser.add_argument("--ttl-days", type=float, help="Delete threads idle for longer than this")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows deleted per transaction")
+    parser.add_argument("--vacuum-pages", type=int, default=DEFAULT_VACUUM_PAGES,
+                        help="Pages released per incremental VACUUM; 0 releases all free pages")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Switch the database to auto_vacuum=INCREMENTAL (runs one full VACUUM)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be deleted")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        report = apply_retention(
+            conn,
+            keep_last=args.keep_last if args.keep_last >= 0 else None,
+            ttl_seconds=args.ttl_days * 86400 if args.ttl_days is not None else None,
+            batch_size=args.batch_size,
+            vacuum_pages=args.vacuum_pages,
+            enable_incremental_vacuum=args.enable_incremental_vacuum,
+            dry_run=args.dry_run,
+        )
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        if report["dry_run"]:
+            print(f"{args.db}: would delete {report['checkpoints_deleted']} checkpoints "
+                  f"({report['threads_expired']} idle threads)")
+            return report
+        print(f"{args.db}: deleted {report['checkpoints_deleted']} checkpoints, {report['writes_deleted']} writes, "
+              f"{report['threads_expired']} idle threads in {report['batches']} batches ({report['elapsed_s']:.2f} s)")
+        print(f"size {report['bytes_before'] / 2**20:.2f} MiB -> {report['bytes_after'] / 2**20:.2f} MiB "
+              f"(reclaimed {report['bytes_reclaimed'] / 2**20:.2f} MiB, vacuum: {report['vacuum']}, "
+              f"{report['free_bytes'] / 2**20:.2f} MiB free in file)")
+        if report["vacuum"] == "none":
+            print("incremental VACUUM did not run: the database uses auto_vacuum=NONE, so freed pages stay in "
+                  "the file for reuse. Run once with --enable-incremental-vacuum to switch it to "
+                  "auto_vacuum=INCREMENTAL (one full VACUUM) and return free pages on later runs.")
+    return report
+
+if __name__ == "__main__":
+    main()
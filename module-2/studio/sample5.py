@@ -11,7 +11,7 @@ load_dotenv(env_path)
 
 from langchain_community.chat_models import ChatTongyi
 from langgraph.graph import StateGraph, START, END, MessagesState
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, RemoveMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langgraph.checkpoint.memory import MemorySaver
 
 model = ChatTongyi(
@@ -19,8 +19,11 @@ model = ChatTongyi(
     model_kwargs={"temperature": 0}  # 通过 model_kwargs 设置温度
 )
 
+from summarization import BackgroundSummarizer, needs_summary, summarize_inline, summary_prompt, summary_update
+
 class State(MessagesState):
     summary: str
+    summarized_through: str
 
 def call_model(state: State):
     summary = state.get("summary", "")
@@ -33,21 +36,11 @@ def call_model(state: State):
     return {"messages": response}
 
 def summarize_conversation(state: State):
-    summary = state.get("summary", "")
-    if summary:
-        summary_message = (f"This is summary of the conversation to date: {summary}\n\n" +
-            "Extend the summary by taking into account the new messages above:")
-    else:
-        summary_message = "Create a summary of the conversation above:"
+    response = model.invoke(summary_prompt(state))
+    return summary_update(state, response.content)
 
-    messages = state["messages"] + [HumanMessage(content=summary_message)]
-    response = model.invoke(messages)
-    delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
-    return {"summary": response.content,"messages": delete_messages}
-
-def should_continue(state: State):
-    messages = state["messages"]
-    if len(messages) > 6:
+def should_continue(state: State, config):
+    if summarize_inline(config) and needs_summary(state):
         return "summarize_conversation"
     else:
         return END
@@ -62,31 +55,39 @@ builder.add_edge("summarize_conversation", END)
 memory = MemorySaver()
 graph = builder.compile(checkpointer=memory)
 
+# 回复返回后再在后台生成摘要，不占用响应时间
+summarizer = BackgroundSummarizer(graph, model)
+
 config = {"configurable": {"thread_id": "123"}}
 
-result = graph.invoke({"messages": [HumanMessage(content="Hi! I am Robert")]}, 
-    config=config)
+with summarizer.turn(config) as turn_config:
+    result = graph.invoke({"messages": [HumanMessage(content="Hi! I am Robert")]},
+        config=turn_config)
 for m in result["messages"]:
     m.pretty_print()
 
 print("====================================")
 
-result = graph.invoke({"messages": [HumanMessage(content="What's my name?")]}, 
-    config=config)
+with summarizer.turn(config) as turn_config:
+    result = graph.invoke({"messages": [HumanMessage(content="What's my name?")]},
+        config=turn_config)
 for m in result["messages"]:
     m.pretty_print()
 
 print("====================================")
-result = graph.invoke({"messages": [HumanMessage(content="I like the 49ers!")]}, 
-    config=config)
+with summarizer.turn(config) as turn_config:
+    result = graph.invoke({"messages": [HumanMessage(content="I like the 49ers!")]},
+        config=turn_config)
 for m in result["messages"]:
     m.pretty_print()
 
 print("====================================")
-result = graph.invoke({"messages": [HumanMessage(content="I like Nick Bosa, isn't he the highest paid defensive player?")]}, 
-    config=config)
+with summarizer.turn(config) as turn_config:
+    result = graph.invoke({"messages": [HumanMessage(content="I like Nick Bosa, isn't he the highest paid defensive player?")]},
+        config=turn_config)
 for m in result["messages"]:
     m.pretty_print()
 
 print("====================================")
+summarizer.join()
 print(graph.get_state(config).values.get("summary","this is no summary yet!"))
\ No newline at end of file
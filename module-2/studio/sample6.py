@@ -9,7 +9,6 @@ if not os.path.exists(env_path):
     env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(env_path)
 
-import sqlite3
 import os
 
 # conn = sqlite3.connect(":memory:")
@@ -22,13 +21,18 @@ db_path = os.path.join(project_root, "state_db", "example.db")
 # 确保目录存在（SQLite 不会自动创建目录）
 os.makedirs(os.path.dirname(db_path), exist_ok=True)
 # SQLite 会自动创建数据库文件（如果不存在）
-conn = sqlite3.connect(db_path, check_same_thread=False)
-
-from langgraph.checkpoint.sqlite import SqliteSaver
-memory = SqliteSaver(conn)
+# 每次读写从有上限的 WAL 连接池（synchronous=NORMAL、busy timeout）中借出一个连接，而不是共享一个加锁的连接
+from checkpoint_retention import apply_retention
+from sqlite_checkpointer import PooledSqliteSaver
+from thread_catalog import ensure_catalog, list_threads
+memory = PooledSqliteSaver.from_path(db_path)
+# threads 目录表：由 checkpoints 上的触发器维护，按更新时间分页列出线程，不必扫描全部 checkpoint
+memory.setup()
+with memory.connection() as conn:
+    ensure_catalog(conn)
 
 from langchain_community.chat_models import ChatTongyi
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, RemoveMessage
+from langchain_core.messages import AIMessage, SystemMessage
 from langgraph.graph import StateGraph, START, END, MessagesState
 
 model = ChatTongyi(
@@ -36,8 +40,11 @@ model = ChatTongyi(
     model_kwargs={"temperature": 0}  # 通过 model_kwargs 设置温度
 )
 
+from summarization import needs_summary, summarize_inline, summary_prompt, summary_update
+
 class State(MessagesState):
     summary: str
+    summarized_through: str
 
 def call_model(state: State):
     summary = state.get("summary", "")
@@ -50,21 +57,11 @@ def call_model(state: State):
     return {"messages": response}
 
 def summarize_conversation(state: State):
-    summary = state.get("summary", "")
-    if summary:
-        summary_message = (f"This is summary of the conversation to date: {summary}\n\n" + 
-            "Extend the summary by taking into account the new messages above:")
-    else:
-        summary_message = "Create a summary of the conversation above:"
-
-    messages = state["messages"] + [HumanMessage(content=summary_message)]
-    response = model.invoke(messages)
-    delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
-    return {"summary": response.content,"messages": delete_messages}
+    response = model.invoke(summary_prompt(state))
+    return summary_update(state, response.content)
 
-def should_continue(state: State):
-    messages = state["messages"]
-    if len(messages) > 6:
+def should_continue(state: State, config):
+    if summarize_inline(config) and needs_summary(state):
         return "summarize_conversation"
     else:
         return END
@@ -78,6 +75,13 @@ builder.add_edge("summarize_conversation", END)
 
 graph = builder.compile(checkpointer=memory)
 
+# 回复返回后再在后台生成摘要，不占用响应时间（见 sample5.py）：
+# from summarization import BackgroundSummarizer
+# summarizer = BackgroundSummarizer(graph, model)
+# with summarizer.turn(config) as turn_config:
+#     result = graph.invoke({"messages": [HumanMessage(content="Hi! I am Robert")]}, config=turn_config)
+# summarizer.join()
+
 # ============================================================================
 # Checkpoint 管理辅助函数
 # ============================================================================
@@ -92,17 +96,58 @@ def delete_thread_checkpoint(thread_id: str):
     memory.delete_thread(thread_id)
     print(f"已删除线程 {thread_id} 的所有 checkpoint 记录")
 
-def list_all_threads():
+def list_threads_page(limit: int = 50, cursor: str = None, user_id: str = None, metadata: dict = None):
     """
-    列出数据库中所有的线程ID
-    
+    按最近更新时间倒序分页列出线程（走 threads 目录表的索引，每页耗时与 checkpoint 总数无关）
+
+    Args:
+        limit: 每页线程数
+        cursor: 上一页返回的 next_cursor，None 表示第一页
+        user_id: 只列出该用户的线程
+        metadata: 其他元数据过滤条件，如 {"team": "a"}
+
+    Returns:
+        ThreadPage: threads（线程信息字典列表）和 next_cursor（最后一页为 None）
+    """
+    with memory.connection() as conn:
+        return list_threads(conn, limit=limit, cursor=cursor, user_id=user_id, metadata=metadata)
+
+def list_all_threads(user_id: str = None):
+    """
+    列出数据库中所有的线程ID（按最近更新时间倒序）
+
+    Args:
+        user_id: 只列出该用户的线程，None 表示全部
+
     Returns:
         list: 所有线程ID的列表
     """
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT thread_id FROM checkpoints")
-    all_threads = [row[0] for row in cursor.fetchall()]
-    return all_threads
+    all_threads, cursor = [], None
+    while True:
+        page = list_threads_page(limit=500, cursor=cursor, user_id=user_id)
+        all_threads.extend(thread["thread_id"] for thread in page.threads)
+        cursor = page.next_cursor
+        if cursor is None:
+            return all_threads
+
+def prune_checkpoints(keep_last: int = 20, ttl_days: float = None):
+    """
+    按保留策略清理 checkpoint：每个线程只保留最近 keep_last 个 checkpoint，
+    超过 ttl_days 天没有新 checkpoint 的线程整体删除，然后增量 VACUUM 回收空间
+    （也可以在命令行运行 python checkpoint_retention.py）
+
+    Args:
+        keep_last: 每个线程保留的 checkpoint 数量
+        ttl_days: 空闲线程的保留天数，None 表示不按时间删除
+
+    Returns:
+        dict: 删除的 checkpoint / writes 数量和回收的字节数
+    """
+    with memory.connection() as conn:
+        report = apply_retention(conn, keep_last=keep_last,
+                                 ttl_seconds=ttl_days * 86400 if ttl_days is not None else None)
+    print(f"已删除 {report['checkpoints_deleted']} 个 checkpoint，回收 {report['bytes_reclaimed']} 字节")
+    return report
 
 # ============================================================================
 
@@ -169,11 +214,12 @@ print(graph_state)
 #    for thread_id in thread_ids_to_cleanup:
 #        memory.delete_thread(thread_id)
 #
-# 4. 查看所有线程（需要直接查询数据库）：
-#    # 可以通过查询数据库来查看所有存储的 thread_id
-#    cursor = conn.cursor()
-#    cursor.execute("SELECT DISTINCT thread_id FROM checkpoints")
-#    all_threads = [row[0] for row in cursor.fetchall()]
-#    print(f"所有线程ID: {all_threads}")
+# 4. 查看所有线程（查询 threads 目录表，而不是 SELECT DISTINCT 扫描 checkpoints）：
+#    page = list_threads_page(limit=20, user_id="lance")
+#    for thread in page.threads:
+#        print(thread["thread_id"], thread["updated_at"], thread["metadata"])
+#    # 下一页
+#    page = list_threads_page(limit=20, user_id="lance", cursor=page.next_cursor)
+#    # 也可以在命令行运行 python thread_catalog.py list --user-id lance
 #
 # ============================================================================
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""Pooled, WAL-mode SQLite checkpointers for the module-2 persistence samples.
+
+`SqliteSaver(sqlite3.connect(db_path, check_same_thread=False))` shares one
+connection between every thread and guards it with one lock, so concurrent
+chats queue behind each other even for reads, and a second process writing
+the same file fails at once with "database is locked". The savers here keep
+LangGraph's SqliteSaver / AsyncSqliteSaver schema and queries but:
+
+- open the database in WAL mode with synchronous=NORMAL, so readers never
+  block the writer and commits do not fsync the main database file
+- set a busy timeout, so concurrent writers wait for each other instead of
+  failing
+- `PooledSqliteSaver` checks a connection out of a bounded pool for each
+  operation instead of taking a saver-wide lock, so concurrent reads do not
+  queue behind each other
+- `PooledAsyncSqliteSaver` checks an aiosqlite connection out of a fixed pool
+  for each operation, so concurrent tasks read in parallel
+
+    memory = PooledSqliteSaver.from_path(db_path)
+    graph = builder.compile(checkpointer=memory)
+
+    async with PooledAsyncSqliteSaver.from_path(db_path, size=4) as memory:
+        graph = builder.compile(checkpointer=memory)
+"""
+
+import asyncio
+import contextvars
+import queue
+import sqlite3
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List, Optional
+
+import aiosqlite
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+# How long a writer waits for another writer's transaction before failing
+BUSY_TIMEOUT_MS = 5000
+
+# Connections in a PooledSqliteSaver pool
+DEFAULT_POOL_SIZE = 4
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+)
+
+def connect(path: str) -> sqlite3.Connection:
+    """A connection to `path` with the WAL / busy timeout settings applied."""
+
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+async def aconnect(path: str) -> aiosqlite.Connection:
+    """Async version of `connect`."""
+
+    conn = await aiosqlite.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    for pragma in PRAGMAS:
+        await conn.execute(pragma)
+    return conn
+
+class PooledSqliteSaver(SqliteSaver):
+    """SqliteSaver over a bounded pool of WAL connections instead of one shared connection.
+
+    Each operation checks a connection out of the pool for its duration (a
+    `list` iteration keeps it until the iterator is exhausted or closed), so
+    up to `size` operations run at once and the number of open connections
+    never exceeds `size`, however many threads LangGraph's executor uses.
+    `conn` is the connection checked out by the current thread; outside the
+    saver's own operations, check one out with `connection()`.
+    """
+
+    def __init__(self, path: str, size: int = DEFAULT_POOL_SIZE, **kwargs):
+        self.path = path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._current: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar(
+            f"sqlite_checkout_{id(self)}", default=None)
+        super().__init__(None, **kwargs)
+
+    @classmethod
+    def from_path(cls, path: str, size: int = DEFAULT_POOL_SIZE, **kwargs) -> "PooledSqliteSaver":
+        return cls(path, size=size, **kwargs)
+
+    def _checked_out(self) -> Optional[sqlite3.Connection]:
+        # Contexts are copied into worker threads, so only trust a checkout
+        # made by this thread
+        current = self._current.get()
+        if current is not None and current[1] == threading.get_ident():
+            return current[0]
+        return None
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check a connection out of the pool (re-entrant within a thread)."""
+
+        conn = self._checked_out()
+        if conn is not None:
+            yield conn
+            return
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect(self.path)
+                with self._connections_lock:
+                    self._connections.append(conn)
+            token = self._current.set((conn, threading.get_ident()))
+            try:
+                yield conn
+            finally:
+                try:
+                    self._current.reset(token)
+                except ValueError:
+                    # A `list` generator closed from another context
+                    pass
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = self._checked_out()
+        if conn is None:
+            raise RuntimeError("No pooled connection is checked out; use `with saver.connection() as conn:`")
+        return conn
+
+    @conn.setter
+    def conn(self, value: sqlite3.Connection) -> None:
+        # SqliteSaver.__init__ assigns the connection it was given; the pool
+        # replaces it
+        pass
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        with self.lock, self.connection():
+            super().setup()
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        # Same as SqliteSaver.cursor, minus the saver-wide lock: the connection
+        # is checked out by this operation and SQLite serializes the writers
+        self.setup()
+        with self.connection() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                if transaction:
+                    conn.commit()
+                cur.close()
+
+    @property
+    def connections(self) -> int:
+        with self._connections_lock:
+            return len(self._connections)
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._idle = queue.LifoQueue()
+
+class _Checkout:
+    """Async context manager that lends a pooled connection to the current task."""
+
+    def __init__(self, saver: "PooledAsyncSqliteSaver"):
+        self.saver = saver
+
+    async def __aenter__(self) -> aiosqlite.Connection:
+        self._conn = await self.saver._pool.get()
+        self._token = self.saver._current.set(self._conn)
+        return self._conn
+
+    async def __aexit__(self, *exc) -> None:
+        try:
+            self.saver._current.reset(self._token)
+        except ValueError:
+            # An async generator (alist) closed from another task's context
+            pass
+        self.saver._pool.put_nowait(self._conn)
+
+class PooledAsyncSqliteSaver(AsyncSqliteSaver):
+    """AsyncSqliteSaver over a fixed pool of WAL aiosqlite connections.
+
+    AsyncSqliteSaver wraps every operation in `async with self.lock` and then
+    uses `self.conn`. Here `lock` checks a connection out of the pool for the
+    duration of the operation and `conn` is the connection checked out by the
+    current task, so up to `size` operations run at once.
+    """
+
+    def __init__(self, connections: List[aiosqlite.Connection], **kwargs):
+        self._pool: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue()
+        for conn in connections:
+            self._pool.put_nowait(conn)
+        self._connections = connections
+        self._current: contextvars.ContextVar[Optional[aiosqlite.Connection]] = contextvars.ContextVar(
+            f"sqlite_checkout_{id(self)}", default=None)
+        self._setup_lock = asyncio.Lock()
+        super().__init__(connections[0], **kwargs)
+
+    @classmethod
+    @asynccontextmanager
+    async def from_path(cls, path: str, size: int = 4, **kwargs) -> AsyncIterator["PooledAsyncSqliteSaver"]:
+        connections = [await aconnect(path) for _ in range(size)]
+        saver = cls(connections, **kwargs)
+        try:
+            # Create the tables before the pool is shared
+            await saver.setup()
+            yield saver
+        finally:
+            for conn in connections:
+                await conn.close()
+
+    @property
+    def conn(self) -> aiosqlite.Connection:
+        return self._current.get() or self._connections[0]
+
+    @conn.setter
+    def conn(self, value: aiosqlite.Connection) -> None:
+        pass
+
+    @property
+    def lock(self) -> _Checkout:
+        return _Checkout(self)
+
+    @lock.setter
+    def lock(self, value: asyncio.Lock) -> None:
+        pass
+
+    async def setup(self) -> None:
+        if self.is_setup:
+            return
+        async with self._setup_lock:
+            await super().setup()
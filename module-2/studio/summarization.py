@@ -0,0 +1,230 @@
+"""Incremental rolling summarization for the module-2 chatbots.
+
+`summarize_conversation` used to send the whole `state["messages"]` plus the
+previous summary to the model whenever the history passed 6 messages, so the
+messages kept after one summary were summarized again by the next. Here the
+state carries a watermark, `summarized_through`, the id of the last message
+already folded into the summary, and:
+
+- only the messages after the watermark are sent, together with the summary
+- summarization is triggered by the approximate token count of those
+  messages (SUMMARY_TRIGGER_TOKENS, default 1000), not by the message count
+
+so each summarization handles about the same amount of text, however long the
+thread has been running.
+
+`BackgroundSummarizer` moves summarization off the response path: the turn
+returns after the model's reply and the summary is computed and written to
+the thread's checkpoint afterwards (see its docstring for how it deals with a
+turn that arrives in the meantime).
+
+    class State(MessagesState):
+        summary: str
+        summarized_through: str
+
+    if needs_summary(state): ...
+    response = model.invoke(summary_prompt(state))
+    return summary_update(state, response.content)
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Sequence, Set
+
+from langchain_core.messages import AnyMessage, HumanMessage, RemoveMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig
+
+# Tokens of not yet summarized messages that trigger a summary
+SUMMARY_TRIGGER_TOKENS = int(os.environ.get("SUMMARY_TRIGGER_TOKENS", 1000))
+
+# Most recent messages kept verbatim in the state after a summary
+KEEP_MESSAGES = 2
+
+def unsummarized(messages: Sequence[AnyMessage], watermark: str = "") -> List[AnyMessage]:
+    """The messages after the one with id `watermark` (all of them if it is gone)."""
+
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].id == watermark:
+            return list(messages[i + 1:])
+    return list(messages)
+
+def needs_summary(state: dict, max_tokens: int = SUMMARY_TRIGGER_TOKENS) -> bool:
+    new_messages = unsummarized(state["messages"], state.get("summarized_through", ""))
+    return count_tokens_approximately(new_messages) > max_tokens
+
+def summary_prompt(state: dict) -> List[AnyMessage]:
+    """The messages since the watermark, followed by the instruction to create or extend the summary."""
+
+    summary = state.get("summary", "")
+    if summary:
+        summary_message = (
+            f"This is summary of the conversation to date: {summary}\n\n"
+            "Extend the summary by taking into account the new messages above:"
+        )
+    else:
+        summary_message = "Create a summary of the conversation above:"
+    new_messages = unsummarized(state["messages"], state.get("summarized_through", ""))
+    return new_messages + [HumanMessage(content=summary_message)]
+
+def summary_update(state: dict, summary: str, keep: int = KEEP_MESSAGES) -> dict:
+    """State update that stores the summary, moves the watermark and trims the history."""
+
+    messages = state["messages"]
+    update = {"summary": summary, "messages": [RemoveMessage(id=m.id) for m in messages[:max(len(messages) - keep, 0)]]}
+    if messages:
+        update["summarized_through"] = messages[-1].id
+    return update
+
+## Background summarization
+
+def summarize_inline(config: Optional[RunnableConfig] = None) -> bool:
+    """False for turns run through a BackgroundSummarizer, which summarizes after the response."""
+
+    return not (config or {}).get("configurable", {}).get("background_summary")
+
+class BackgroundSummarizer:
+    """Summarizes a thread after its turn has returned, off the response path.
+
+    Turns are wrapped in `turn` (or `aturn`), which tells the graph to skip its
+    summarize_conversation node and, once the turn is done, schedules a summary
+    of the thread's checkpoint on a worker:
+
+        with summarizer.turn(config) as turn_config:
+            result = graph.invoke({"messages": [message]}, turn_config)
+
+    Conflicts with the next turn are handled per thread:
+
+    - one summary runs at a time, and it re-reads the checkpoint, so a summary
+      that is no longer needed is skipped
+    - the model call runs without blocking turns, but writing the result takes
+      the same lock as a turn, so it never lands in the middle of one
+    - the result is only written if the summary and watermark are still the
+      ones it started from and its last message is still there; otherwise it
+      is dropped (counted as a conflict) and the next turn schedules a new one
+    - the update only removes the summarized messages by id, so messages a
+      newer turn added stay in place
+    """
+
+    def __init__(self, graph, model, node: str = "summarize_conversation", max_workers: int = 2,
+                 max_tokens: int = SUMMARY_TRIGGER_TOKENS):
+        self.graph = graph
+        self.model = model
+        self.node = node
+        self.max_tokens = max_tokens
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarize")
+        self._lock = threading.Lock()
+        # Per-thread locks live only while a turn or summary holds or waits for
+        # them, so threads that went quiet do not keep an entry
+        self._turn_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+        self._summary_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+        self._async_turn_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._async_summary_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._pending: Set[Future] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.applied = 0
+        self.skipped = 0
+        self.conflicts = 0
+
+    @staticmethod
+    def _thread_config(config: RunnableConfig) -> RunnableConfig:
+        return {"configurable": {"thread_id": config["configurable"]["thread_id"]}}
+
+    @staticmethod
+    def _background_config(config: RunnableConfig) -> RunnableConfig:
+        return {**config, "configurable": {**config.get("configurable", {}), "background_summary": True}}
+
+    def _thread_lock(self, locks: weakref.WeakValueDictionary, thread_id: str, factory: Callable = threading.Lock):
+        with self._lock:
+            lock = locks.get(thread_id)
+            if lock is None:
+                lock = locks[thread_id] = factory()
+            return lock
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _conflicting(self, snapshot: dict, latest: dict) -> bool:
+        ids = {m.id for m in latest.get("messages", [])}
+        return (latest.get("summary", "") != snapshot.get("summary", "")
+                or latest.get("summarized_through", "") != snapshot.get("summarized_through", "")
+                or snapshot["messages"][-1].id not in ids)
+
+    ## Sync
+
+    @contextmanager
+    def turn(self, config: RunnableConfig) -> Iterator[RunnableConfig]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._thread_lock(self._turn_locks, thread_id):
+            yield self._background_config(config)
+        future = self._executor.submit(self._summarize, self._thread_config(config))
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+    def _summarize(self, config: RunnableConfig) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._thread_lock(self._summary_locks, thread_id):
+            snapshot = self.graph.get_state(config).values
+            if not snapshot.get("messages") or not needs_summary(snapshot, self.max_tokens):
+                self._count("skipped")
+                return
+            response = self.model.invoke(summary_prompt(snapshot))
+            with self._thread_lock(self._turn_locks, thread_id):
+                if self._conflicting(snapshot, self.graph.get_state(config).values):
+                    self._count("conflicts")
+                    return
+                self.graph.update_state(config, summary_update(snapshot, response.content), as_node=self.node)
+            self._count("applied")
+
+    def join(self) -> None:
+        """Wait for the scheduled summaries."""
+
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+
+    ## Async
+
+    @asynccontextmanager
+    async def aturn(self, config: RunnableConfig) -> AsyncIterator[RunnableConfig]:
+        thread_id = config["configurable"]["thread_id"]
+        async with self._thread_lock(self._async_turn_locks, thread_id, asyncio.Lock):
+            yield self._background_config(config)
+        task = asyncio.create_task(self._asummarize(self._thread_config(config)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _asummarize(self, config: RunnableConfig) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        async with self._thread_lock(self._async_summary_locks, thread_id, asyncio.Lock):
+            snapshot = (await self.graph.aget_state(config)).values
+            if not snapshot.get("messages") or not needs_summary(snapshot, self.max_tokens):
+                self._count("skipped")
+                return
+            response = await self.model.ainvoke(summary_prompt(snapshot))
+            async with self._thread_lock(self._async_turn_locks, thread_id, asyncio.Lock):
+                if self._conflicting(snapshot, (await self.graph.aget_state(config)).values):
+                    self._count("conflicts")
+                    return
+                await self.graph.aupdate_state(config, summary_update(snapshot, response.content), as_node=self.node)
+            self._count("applied")
+
+    async def ajoin(self) -> None:
+        """Wait for the scheduled summaries."""
+
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"applied": self.applied, "skipped": self.skipped, "conflicts": self.conflicts}
@@ -0,0 +1,212 @@
+"""Indexed thread catalog for the SQLite checkpoint database.
+
+`list_all_threads` used to run `SELECT DISTINCT thread_id FROM checkpoints`,
+a scan of every checkpoint, and return all threads at once. The catalog is a
+`threads` table with one row per thread:
+
+    thread_id | created_at | updated_at | last_checkpoint_id | user_id | metadata
+
+- triggers on `checkpoints` keep it current for every writer of the file
+  (SqliteSaver, PooledSqliteSaver, other processes): each new root checkpoint
+  bumps updated_at and merges its run metadata (minus LangGraph's own source /
+  step / parents / writes keys) into the thread's, and deleting a thread's
+  last checkpoint (delete_thread, checkpoint_retention) removes its row
+- threads are listed newest first from the (updated_at, thread_id) index,
+  or the (user_id, updated_at, thread_id) index when filtering by user,
+  with keyset ("cursor") pagination, so each page costs the same however
+  many checkpoints the database holds
+- other metadata keys can be filtered on too (json_extract on the page's
+  rows, so combine them with user_id or expect a longer scan)
+
+`ensure_catalog` creates the table, indexes and triggers and fills the table
+from the existing checkpoints the first time.
+
+    ensure_catalog(conn)
+    page = list_threads(conn, limit=50, user_id="lance")
+    next_page = list_threads(conn, limit=50, user_id="lance", cursor=page.next_cursor)
+
+    python thread_catalog.py list --user-id lance --limit 20
+"""
+
+import argparse
+import base64
+import json
+import sqlite3
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from checkpoint_retention import checkpoint_time, default_db_path
+
+# Unix time in SQL, for the triggers (which run in every writer's connection,
+# so they cannot call Python functions)
+SQL_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+# Run metadata keys LangGraph adds to every checkpoint
+SQL_RUN_METADATA = "json_remove(CAST(NEW.metadata AS TEXT), '$.source', '$.step', '$.parents', '$.writes')"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_checkpoint_id TEXT,
+    user_id TEXT,
+    metadata TEXT NOT NULL DEFAULT '{{}}'
+);
+CREATE INDEX IF NOT EXISTS threads_updated ON threads (updated_at, thread_id);
+CREATE INDEX IF NOT EXISTS threads_user_updated ON threads (user_id, updated_at, thread_id);
+
+CREATE TRIGGER IF NOT EXISTS threads_on_checkpoint AFTER INSERT ON checkpoints
+WHEN NEW.checkpoint_ns = ''
+BEGIN
+    INSERT INTO threads (thread_id, created_at, updated_at, last_checkpoint_id, user_id, metadata)
+    VALUES (NEW.thread_id, {SQL_NOW}, {SQL_NOW}, NEW.checkpoint_id,
+            json_extract(CAST(NEW.metadata AS TEXT), '$.user_id'), {SQL_RUN_METADATA})
+    ON CONFLICT (thread_id) DO UPDATE SET
+        updated_at = excluded.updated_at,
+        last_checkpoint_id = excluded.last_checkpoint_id,
+        user_id = coalesce(excluded.user_id, threads.user_id),
+        metadata = json_patch(threads.metadata, excluded.metadata);
+END;
+
+CREATE TRIGGER IF NOT EXISTS threads_on_delete AFTER DELETE ON checkpoints
+WHEN OLD.checkpoint_ns = ''
+BEGIN
+    DELETE FROM threads WHERE thread_id = OLD.thread_id
+        AND NOT EXISTS (SELECT 1 FROM checkpoints WHERE thread_id = OLD.thread_id AND checkpoint_ns = '');
+END;
+"""
+
+class ThreadPage(NamedTuple):
+    threads: List[Dict[str, Any]]
+    next_cursor: Optional[str] # None on the last page
+
+def _encode_cursor(updated_at: float, thread_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([updated_at, thread_id]).encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        updated_at, thread_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid thread cursor: {cursor!r}") from e
+    return float(updated_at), str(thread_id)
+
+def ensure_catalog(conn: sqlite3.Connection) -> None:
+    """Create the catalog on a checkpoint database and backfill it on first use."""
+
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'threads'").fetchone()
+    conn.executescript(SCHEMA)
+    if not exists:
+        backfill(conn)
+
+def backfill(conn: sqlite3.Connection) -> int:
+    """(Re)build the catalog from the checkpoints table; returns the number of threads."""
+
+    now = time.time()
+    conn.create_function("checkpoint_time", 1, lambda checkpoint_id: checkpoint_time(checkpoint_id) or now,
+                         deterministic=True)
+    with conn:
+        conn.execute("DELETE FROM threads")
+        # One pass over the primary key for the first / last checkpoint of
+        # each thread, then a key lookup for the last checkpoint's metadata
+        conn.execute(
+            """INSERT INTO threads (thread_id, created_at, updated_at, last_checkpoint_id, user_id, metadata)
+               SELECT thread_id, checkpoint_time(first_id), checkpoint_time(last_id), last_id,
+                      json_extract(metadata, '$.user_id'),
+                      json_remove(metadata, '$.source', '$.step', '$.parents', '$.writes')
+               FROM (
+                   SELECT t.thread_id, t.first_id, t.last_id, CAST(c.metadata AS TEXT) AS metadata
+                   FROM (SELECT thread_id, MIN(checkpoint_id) AS first_id, MAX(checkpoint_id) AS last_id
+                         FROM checkpoints WHERE checkpoint_ns = '' GROUP BY thread_id) t
+                   JOIN checkpoints c ON c.thread_id = t.thread_id AND c.checkpoint_ns = '' AND c.checkpoint_id = t.last_id
+               )"""
+        )
+    return conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+
+def _row(row: tuple) -> Dict[str, Any]:
+    thread_id, created_at, updated_at, last_checkpoint_id, user_id, metadata = row
+    return {
+        "thread_id": thread_id,
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "last_checkpoint_id": last_checkpoint_id,
+        "user_id": user_id,
+        "metadata": json.loads(metadata) if metadata else {},
+    }
+
+def list_threads(
+    conn: sqlite3.Connection,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    user_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    updated_after: Optional[float] = None,
+) -> ThreadPage:
+    """One page of threads, most recently updated first."""
+
+    sql = "SELECT thread_id, created_at, updated_at, last_checkpoint_id, user_id, metadata FROM threads"
+    conditions, params = [], []
+    if user_id is not None:
+        conditions.append("user_id = ?")
+        params.append(user_id)
+    if updated_after is not None:
+        conditions.append("updated_at > ?")
+        params.append(updated_after)
+    if cursor is not None:
+        # Keyset pagination: continue right after the last row of the previous page
+        conditions.append("(updated_at, thread_id) < (?, ?)")
+        params.extend(_decode_cursor(cursor))
+    for key, value in (metadata or {}).items():
+        conditions.append("json_extract(metadata, ?) = ?")
+        params.extend([f'$."{key}"', value])
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY updated_at DESC, thread_id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    rows = conn.execute(sql, params).fetchall()
+    threads = [_row(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = threads[-1]
+        next_cursor = _encode_cursor(last["updated_at"], last["thread_id"])
+    return ThreadPage(threads, next_cursor)
+
+def get_thread(conn: sqlite3.Connection, thread_id: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute(
+        "SELECT thread_id, created_at, updated_at, last_checkpoint_id, user_id, metadata FROM threads WHERE thread_id = ?",
+        (thread_id,),
+    ).fetchone()
+    return _row(row) if row else None
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=default_db_path(), help="Checkpoint database (default: state_db/example.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    list_parser = subparsers.add_parser("list", help="List threads, most recently updated first")
+    list_parser.add_argument("--limit", type=int, default=20)
+    list_parser.add_argument("--cursor", help="next_cursor printed by the previous page")
+    list_parser.add_argument("--user-id")
+    list_parser.add_argument("--meta", action="append", default=[], metavar="KEY=VALUE",
+                             help="Metadata filter (repeatable)")
+    subparsers.add_parser("rebuild", help="Rebuild the catalog from the checkpoints table")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        ensure_catalog(conn)
+        if args.command == "rebuild":
+            print(f"{backfill(conn)} threads")
+            return
+        filters = dict(item.split("=", 1) for item in args.meta)
+        page = list_threads(conn, args.limit, args.cursor, args.user_id, filters)
+        for thread in page.threads:
+            updated = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(thread["updated_at"]))
+            print(f"{thread['thread_id']:<40} {updated}  user={thread['user_id']}  {json.dumps(thread['metadata'])}")
+        if page.next_cursor:
+            print(f"next cursor: {page.next_cursor}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,7 @@ if not os.path.exists(env_path):
 load_dotenv(env_path)
 
 from langchain_community.chat_models import ChatTongyi
-from langchain_core.messages import SystemMessage, HumanMessage, RemoveMessage
+from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.runnables import RunnableConfig
 
 from langgraph.checkpoint.memory import MemorySaver
@@ -20,6 +20,8 @@ from langgraph.graph import MessagesState
 
 from typing_extensions import Literal
 
+from summarization import BackgroundSummarizer, needs_summary, summarize_inline, summary_prompt, summary_update
+
 model = ChatTongyi(
     model="qwen-plus",  # 或 "qwen-turbo", "qwen-max" 等
     model_kwargs={"temperature": 0},  # 通过 model_kwargs 设置温度
@@ -29,6 +31,7 @@ model = ChatTongyi(
 # State 
 class State(MessagesState):
     summary: str
+    summarized_through: str
 
 # Define the logic to call the model
 async def call_model(state: State):
@@ -66,38 +69,20 @@ async def call_model(state: State):
 
 def summarize_conversation(state: State):
     
-    # First, we get any existing summary
-    summary = state.get("summary", "")
-
-    # Create our summarization prompt 
-    if summary:
-        
-        # A summary already exists
-        summary_message = (
-            f"This is summary of the conversation to date: {summary}\n\n"
-            "Extend the summary by taking into account the new messages above:"
-        )
-        
-    else:
-        summary_message = "Create a summary of the conversation above:"
-
-    # Add prompt to our history
-    messages = state["messages"] + [HumanMessage(content=summary_message)]
-    response = model.invoke(messages)
+    # Summarize only the messages added since the last summary, extending it if it exists
+    response = model.invoke(summary_prompt(state))
     
-    # Delete all but the 2 most recent messages
-    delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
-    return {"summary": response.content, "messages": delete_messages}
+    # Delete all but the 2 most recent messages, add our summary and move the watermark
+    return summary_update(state, response.content)
 
 # Determine whether to end or summarize the conversation
-def should_continue(state: State)-> Literal ["summarize_conversation",END]:
+def should_continue(state: State, config: RunnableConfig)-> Literal ["summarize_conversation",END]:
     
     """Return the next node to execute."""
     
-    messages = state["messages"]
-    
-    # If there are more than six messages, then we summarize the conversation
-    if len(messages) > 6:
+    # If the messages since the last summary exceed the token budget, then we summarize them,
+    # unless a BackgroundSummarizer does it after the response
+    if summarize_inline(config) and needs_summary(state):
         return "summarize_conversation"
     
     # Otherwise we can just end
@@ -117,6 +102,9 @@ workflow.add_edge("summarize_conversation", END)
 memory = MemorySaver()
 graph = workflow.compile(checkpointer=memory)
 
+# Summarize after the response has streamed, off the response path
+summarizer = BackgroundSummarizer(graph, model)
+
 # config = {"configurable": {"thread_id": "123"}}
 
 # for chunk in graph.stream({"messages": [
@@ -142,19 +130,20 @@ async def main():
     full_content = ""
     
     # 监听 on_chat_model_stream 事件来获取流式输出
-    async for event in graph.astream_events({"messages": [input_message]}, config, version="v2"):
-        if event["event"] == "on_chat_model_stream" and event.get("metadata", {}).get("langgraph_node", "") == node_to_stream:
-            # 从事件数据中提取 chunk 内容并实时打印
-            data = event.get("data", {})
-            print(data)
-            chunk = data.get("chunk")
-            if chunk and hasattr(chunk, 'content'):
-                chunk_content = chunk.content
-                # 累积内容
-                full_content += chunk_content
-                # 流式输出
-                node_name = event.get("metadata", {}).get("langgraph_node", "")
-                print(f"node_name: {node_name},chunk_content: {chunk_content}")
+    async with summarizer.aturn(config) as turn_config:
+        async for event in graph.astream_events({"messages": [input_message]}, turn_config, version="v2"):
+            if event["event"] == "on_chat_model_stream" and event.get("metadata", {}).get("langgraph_node", "") == node_to_stream:
+                # 从事件数据中提取 chunk 内容并实时打印
+                data = event.get("data", {})
+                print(data)
+                chunk = data.get("chunk")
+                if chunk and hasattr(chunk, 'content'):
+                    chunk_content = chunk.content
+                    # 累积内容
+                    full_content += chunk_content
+                    # 流式输出
+                    node_name = event.get("metadata", {}).get("langgraph_node", "")
+                    print(f"node_name: {node_name},chunk_content: {chunk_content}")
     
     print()  # 换行
     print("\n" + "="*50)
@@ -163,6 +152,9 @@ async def main():
     print(full_content)
     print("="*50)
 
+    # 等待后台摘要写回 checkpoint
+    await summarizer.ajoin()
+
 if __name__ == "__main__":
     asyncio.run(main())
     print("====================================")
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""Micro-batching of concurrent runnable calls.
+
+Nodes launched together with the Send() API each make their own model call.
+A `MicroBatcher` collects the calls that arrive within `flush_interval`
+seconds (or until `max_batch_size` are waiting) and runs them as one
+`runnable.batch` / `runnable.abatch` call, handing every caller its own result.
+
+This shapes concurrency; it does not save round trips. Chat models such as
+`ChatOpenAI` implement `batch` as one request per input (run in a thread
+pool, or gathered for `abatch`), so a batch of n prompts is still n HTTP
+requests. What changes is when they are sent: calls are released in groups
+of up to `max_batch_size` (a `max_concurrency` in the first caller's config
+caps how many of a group are in flight), at the cost of waiting up to
+`flush_interval` for a group to fill. benchmarks/run_graphs.py measures that
+cost for map_reduce (`map_reduce[batch=N]`). Fewer round trips would need a
+runnable whose `batch` calls a real batch endpoint.
+
+Each call passes its node's `config`, and the batch call gets the list of
+them (`batch(inputs, config=[...])`), so every item still runs under its own
+caller: callbacks, tags, tracing and streaming stay with the node and graph
+run that made the call, even when one batch mixes calls from several runs.
+
+Sync callers (nodes running in LangGraph's thread pool) block on a future;
+async callers await one on their event loop.
+"""
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ensure_config
+
+class MicroBatcher:
+    """Groups concurrent `invoke` / `ainvoke` calls into `batch` / `abatch` calls."""
+
+    def __init__(self, runnable, max_batch_size: int = 8, flush_interval: float = 0.02):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.runnable = runnable
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.batches = 0
+        self.items = 0
+
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[Any, RunnableConfig, Future]] = []
+        self._timer = None
+        # Running async batches, referenced until done so they are not garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Async state is per event loop: pending items and the flush handle
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+    ## Sync
+
+    def invoke(self, value: Any, config: Optional[RunnableConfig] = None) -> Any:
+        # Resolve the config on the caller's thread, where the node's run context is set
+        config = ensure_config(config)
+        future: Future = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((value, config, future))
+            if len(self._pending) >= self.max_batch_size:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        # A full batch runs on the thread that completed it
+        if batch:
+            self._run(batch)
+        return future.result()
+
+    def _take(self) -> List[Tuple[Any, RunnableConfig, Future]]:
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._run(batch)
+
+    def _count(self, batch: list) -> None:
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+
+    def _run(self, batch: List[Tuple[Any, RunnableConfig, Future]]) -> None:
+        self._count(batch)
+        try:
+            outputs = self.runnable.batch([value for value, _, _ in batch], config=[config for _, config, _ in batch],
+                                          return_exceptions=True)
+        except Exception as e:
+            outputs = [e] * len(batch)
+        for (_, _, future), output in zip(batch, outputs):
+            if isinstance(output, Exception):
+                future.set_exception(output)
+            else:
+                future.set_result(output)
+
+    ## Async
+
+    async def ainvoke(self, value: Any, config: Optional[RunnableConfig] = None) -> Any:
+        config = ensure_config(config)
+        loop = asyncio.get_running_loop()
+        state = self._loops.setdefault(loop, {"pending": [], "handle": None})
+        future = loop.create_future()
+        state["pending"].append((value, config, future))
+        if len(state["pending"]) >= self.max_batch_size:
+            self._aflush(state)
+        elif state["handle"] is None:
+            state["handle"] = loop.call_later(self.flush_interval, self._aflush, state)
+        return await future
+
+    def _aflush(self, state: Dict[str, Any]) -> None:
+        batch, state["pending"] = state["pending"], []
+        if state["handle"] is not None:
+            state["handle"].cancel()
+            state["handle"] = None
+        if batch:
+            task = asyncio.ensure_future(self._arun(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _arun(self, batch: List[Tuple[Any, RunnableConfig, asyncio.Future]]) -> None:
+        self._count(batch)
+        try:
+            outputs = await self.runnable.abatch([value for value, _, _ in batch],
+                                                 config=[config for _, config, _ in batch], return_exceptions=True)
+        except Exception as e:
+            outputs = [e] * len(batch)
+        for (_, _, future), output in zip(batch, outputs):
+            if future.done():
+                continue
+            if isinstance(output, Exception):
+                future.set_exception(output)
+            else:
+                future.set_result(output)
+
+    def stats(self) -> dict:
+        with self._lock:
+            batches, items = self.batches, self.items
+        return {
+            "batches": batches,
+            "items": items,
+            "average_batch_size": items / batches if batches else 0.0,
+        }
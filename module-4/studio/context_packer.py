@@ -0,0 +1,177 @@
+"""Token-budgeted context assembly for the research assistant prompts.
+
+`generate_answer` and `write_section` used to paste every retrieved document
+into the prompt, so prompt size grew with each interview turn. The packer
+instead:
+
+- splits each document into paragraph chunks and counts their tokens once,
+  caching the result by a hash of the document's header and content (document
+  ids come from the source, and a source can return different text later)
+- scores chunks against the current question (BM25 over the candidate chunks)
+- keeps the best chunks that fit in the token budget, rendered in their
+  original document order with the usual <Document ...> tags
+
+The budget comes from config["configurable"]["context_token_budget"], falling
+back to the CONTEXT_TOKEN_BUDGET environment variable (default 6000).
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 6000))
+
+# Paragraphs are merged until a chunk reaches roughly this many tokens
+CHUNK_TOKENS = 200
+
+# Number of documents whose chunks are kept in the cache
+MAX_CACHED_DOCS = 4096
+
+_WORD = re.compile(r"\w+")
+
+def _load_token_counter() -> Callable[[str], int]:
+    """tiktoken for the gpt-4o family when available, else ~4 characters per token."""
+
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        return lambda text: math.ceil(len(text) / 4)
+
+_token_counter: Optional[Callable[[str], int]] = None
+
+def count_tokens(text: str) -> int:
+    global _token_counter
+    if _token_counter is None:
+        # Loaded on first use, as tiktoken may need to fetch its vocabulary
+        _token_counter = _load_token_counter()
+    return _token_counter(text)
+
+def get_token_budget(config: Optional[RunnableConfig] = None) -> int:
+    configurable = (config or {}).get("configurable", {})
+    return int(configurable.get("context_token_budget", DEFAULT_TOKEN_BUDGET))
+
+def _terms(text: str) -> List[str]:
+    return [term.lower() for term in _WORD.findall(text)]
+
+def split_chunks(content: str) -> List[Tuple[str, int]]:
+    """Split a document into (chunk text, token count) pairs on paragraph boundaries."""
+
+    pieces = []
+    for paragraph in (p.strip() for p in re.split(r"\n\s*\n", content)):
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens <= CHUNK_TOKENS:
+            pieces.append((paragraph, tokens))
+        else:
+            # Oversized paragraphs are split further on sentence boundaries
+            pieces.extend((sentence, count_tokens(sentence)) for sentence in re.split(r"(?<=[.!?])\s+", paragraph))
+
+    chunks, current, current_tokens = [], [], 0
+    for paragraph, tokens in pieces:
+        if current and current_tokens + tokens > CHUNK_TOKENS:
+            chunks.append(("\n\n".join(current), current_tokens))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append(("\n\n".join(current), current_tokens))
+    return chunks
+
+class ContextPacker:
+    """Selects the highest-value document chunks that fit a token budget."""
+
+    def __init__(self, max_cached_docs: int = MAX_CACHED_DOCS):
+        self.max_cached_docs = max_cached_docs
+        self._chunks: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def chunks(self, doc: Dict) -> tuple:
+        """(header tokens, [(chunk, tokens, term counts)]) for a document, computed once per text."""
+
+        hasher = hashlib.sha256(doc["header"].encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update(doc["content"].encode("utf-8"))
+        key = hasher.hexdigest()
+        with self._lock:
+            cached = self._chunks.get(key)
+            if cached is not None:
+                self._chunks.move_to_end(key)
+                return cached
+        cached = (
+            count_tokens(doc["header"]) + count_tokens("</Document>"),
+            [(text, tokens, Counter(_terms(text))) for text, tokens in split_chunks(doc["content"])],
+        )
+        with self._lock:
+            self._chunks[key] = cached
+            while len(self._chunks) > self.max_cached_docs:
+                self._chunks.popitem(last=False)
+        return cached
+
+    def pack(self, store, doc_ids: Iterable[str], query: str, budget: int) -> str:
+        """Render the best chunks of `doc_ids` for `query` within `budget` tokens."""
+
+        docs = [doc for doc in (store.get(doc_id) for doc_id in doc_ids) if doc is not None]
+
+        # Candidate chunks: (doc index, chunk index, text, tokens, term counts)
+        candidates = []
+        header_tokens = {}
+        for doc_index, doc in enumerate(docs):
+            header_tokens[doc_index], doc_chunks = self.chunks(doc)
+            for chunk_index, (text, tokens, terms) in enumerate(doc_chunks):
+                candidates.append((doc_index, chunk_index, text, tokens, terms))
+
+        # Greedily take the best scoring chunks, paying for a document's tags
+        # the first time one of its chunks is selected
+        scores = self._bm25(candidates, _terms(query))
+        selected, used, opened = [], 0, set()
+        for score, candidate in sorted(zip(scores, candidates), key=lambda item: (-item[0], item[1][0], item[1][1])):
+            doc_index, _, _, tokens, _ = candidate
+            cost = tokens + (0 if doc_index in opened else header_tokens[doc_index])
+            if used + cost > budget:
+                continue
+            selected.append(candidate)
+            opened.add(doc_index)
+            used += cost
+
+        # Render in document order so citations stay stable
+        blocks = []
+        for doc_index in sorted(opened):
+            parts = [c[2] for c in sorted(selected, key=lambda c: c[1]) if c[0] == doc_index]
+            blocks.append(f'{docs[doc_index]["header"]}\n' + "\n\n".join(parts) + "\n</Document>")
+        return "\n\n---\n\n".join(blocks)
+
+    @staticmethod
+    def _bm25(candidates: List[tuple], query_terms: List[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+        if not candidates:
+            return []
+        n = len(candidates)
+        average_length = sum(sum(c[4].values()) for c in candidates) / n or 1.0
+        document_frequency = Counter(term for c in candidates for term in c[4])
+        scores = []
+        for _, _, _, _, terms in candidates:
+            length = sum(terms.values())
+            score = 0.0
+            for term in set(query_terms):
+                frequency = terms.get(term, 0)
+                if frequency:
+                    idf = math.log(1 + (n - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                    score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+            scores.append(score)
+        return scores
+
+# Shared so token counts are reused across nodes and interviews
+context_packer = ContextPacker()
+
+def pack_context(store, doc_ids: Iterable[str], query: str, config: Optional[RunnableConfig] = None) -> str:
+    """Pack `doc_ids` from a DocumentStore into the run's context token budget."""
+
+    return context_packer.pack(store, doc_ids, query, get_token_budget(config))
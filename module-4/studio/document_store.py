@@ -0,0 +1,101 @@
+"""Deduplicated source documents, kept in the graph state.
+
+Analysts often retrieve the same URLs and Wikipedia pages turn after turn.
+Instead of appending full document text to `context` on every retrieval,
+search nodes store each document once under a stable id:
+
+- a document is identified by its source (URL, plus page for paged files) and,
+  failing that, by a hash of its content, so repeated retrievals map to the same id
+- `documents` maps ids to the document text; search nodes only write ids the
+  state does not hold yet, and `merge_documents` keeps the first copy of an id
+- `context` becomes a list of ids, merged without duplicates by `merge_doc_ids`
+- nodes that need the text (answering, section writing) render it with
+  `DocumentStore(state["documents"])`
+
+`documents` is a key of both the research graph and the interview state. Each
+interview starts from the run's map (passed in its Send()), and its documents
+merge back into the run's map when it finishes, so the run ends up with one
+copy of every document. Interviews started together cannot see each other's
+retrievals while they run; a document two of them fetch is stored in both
+interviews and collapses to one entry when they merge back.
+
+The keys are checkpointed with the rest of the state, so a run resumed after
+a restart or on another worker sees the same documents. An id in `context`
+that is missing from `documents` raises `MissingDocumentError` instead of
+silently leaving the model without context.
+"""
+
+import hashlib
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from retrieval import document_header
+
+class MissingDocumentError(KeyError):
+    """A document id referenced in `context` has no entry in `documents`."""
+
+def merge_doc_ids(left: Optional[List[str]], right: Optional[List[str]]) -> List[str]:
+    """Reducer for `context`: append new document ids, skipping ones already present."""
+
+    merged = list(left or [])
+    seen = set(merged)
+    for doc_id in right or []:
+        if doc_id not in seen:
+            seen.add(doc_id)
+            merged.append(doc_id)
+    return merged
+
+def merge_documents(left: Optional[Dict[str, dict]], right: Optional[Dict[str, dict]]) -> Dict[str, dict]:
+    """Reducer for `documents`: add new ids, keeping the first copy of each document."""
+
+    merged = dict(left or {})
+    for doc_id, doc in (right or {}).items():
+        merged.setdefault(doc_id, doc)
+    return merged
+
+def document_id(content: str, source: Optional[str] = None, page: Any = None) -> str:
+    key = f"source:{source}#{page if page is not None else ''}" if source else f"content:{content}"
+    return f"doc-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}"
+
+def register_documents(docs: Iterable[Document], known: Optional[Mapping[str, dict]] = None) -> Tuple[List[str], Dict[str, dict]]:
+    """Ids for Documents returned by a retrieval backend, and the entries not in `known` yet.
+
+    Returns `(doc_ids, new_documents)`, the `context` and `documents` updates
+    of a search node.
+    """
+
+    known = known or {}
+    doc_ids, new_documents = [], {}
+    for doc in docs:
+        source = doc.metadata.get("source")
+        doc_id = document_id(doc.page_content, source, doc.metadata.get("page"))
+        doc_ids.append(doc_id)
+        if doc_id not in known and doc_id not in new_documents:
+            new_documents[doc_id] = {"header": document_header(doc), "content": doc.page_content, "source": source}
+    return doc_ids, new_documents
+
+class DocumentStore:
+    """Read access to the documents of a run or interview."""
+
+    def __init__(self, documents: Optional[Mapping[str, dict]] = None):
+        self._docs: Mapping[str, Dict[str, Any]] = documents or {}
+
+    def get(self, doc_id: str) -> Dict[str, Any]:
+        try:
+            return self._docs[doc_id]
+        except KeyError:
+            raise MissingDocumentError(
+                f"Document {doc_id!r} is referenced in context but missing from the state's documents") from None
+
+    def format(self, doc_ids: Iterable[str]) -> str:
+        """Render documents in the <Document ...> format the prompts expect."""
+
+        blocks = []
+        for doc_id in doc_ids:
+            doc = self.get(doc_id)
+            blocks.append(f'{doc["header"]}\n{doc["content"]}\n</Document>')
+        return "\n\n---\n\n".join(blocks)
+
+    def stats(self) -> dict:
+        return {"documents": len(self._docs)}
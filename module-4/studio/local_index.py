@@ -0,0 +1,224 @@
+"""On-disk BM25 index over a directory of text documents.
+
+Lets the research graphs retrieve from a local corpus without any network
+access. `LocalBM25Index.build` walks a corpus directory once and writes three
+files to the index directory:
+
+- index.json: document table (source, title, length) and the lexicon, which
+  maps each term to its offset and document frequency in the postings file
+- postings.bin: (doc id, term frequency) pairs as native uint32, grouped by term
+- documents.bin: the UTF-8 text of every document, back to back
+
+Opening an index memory-maps postings.bin and documents.bin, so only the pages
+a query touches are read and several processes can share them through the OS
+page cache.
+
+Usage:
+
+    python local_index.py build ./corpus ./state_db/local_index
+    python local_index.py search ./state_db/local_index "query text" -k 3
+"""
+
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import time
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INDEX_FILE = "index.json"
+POSTINGS_FILE = "postings.bin"
+DOCUMENTS_FILE = "documents.bin"
+INDEX_VERSION = 1
+
+DEFAULT_EXTENSIONS = (".txt", ".md", ".rst")
+
+_WORD = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    return [term.lower() for term in _WORD.findall(text)]
+
+def _title(path: str, text: str) -> str:
+    # First non-empty line (markdown headings included), else the file name
+    for line in text.splitlines():
+        line = line.strip().lstrip("#").strip()
+        if line:
+            return line[:200]
+    return os.path.basename(path)
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    # mmap cannot map empty files
+    if os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class LocalBM25Index:
+    """Read-only BM25 index backed by memory-mapped files."""
+
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+
+        with open(os.path.join(index_dir, INDEX_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION or meta.get("byteorder") != sys.byteorder:
+            raise ValueError(f"Index at {index_dir} was built by another version or platform; rebuild it")
+
+        self.documents: List[dict] = meta["documents"]
+        self.terms: Dict[str, Tuple[int, int]] = meta["terms"]
+        self.average_length: float = meta["average_length"] or 1.0
+        self._lengths = [doc["tokens"] for doc in self.documents]
+
+        self._postings_map = _map(os.path.join(index_dir, POSTINGS_FILE))
+        self._documents_map = _map(os.path.join(index_dir, DOCUMENTS_FILE))
+        self._postings = memoryview(self._postings_map).cast("I") if self._postings_map else memoryview(array("I"))
+
+    @classmethod
+    def build(cls, corpus_dir: str, index_dir: str, extensions: Iterable[str] = DEFAULT_EXTENSIONS) -> "LocalBM25Index":
+        """Index every file under `corpus_dir` with one of `extensions`."""
+
+        extensions = tuple(extensions)
+        paths = []
+        for root, dirs, files in os.walk(corpus_dir):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files) if name.endswith(extensions))
+
+        os.makedirs(index_dir, exist_ok=True)
+        documents, postings = [], defaultdict(list)
+        offset = 0
+        documents_tmp = os.path.join(index_dir, DOCUMENTS_FILE + ".tmp")
+        with open(documents_tmp, "wb") as out:
+            for doc_id, path in enumerate(paths):
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+                data = text.encode("utf-8")
+                out.write(data)
+
+                terms = Counter(tokenize(text))
+                for term, frequency in terms.items():
+                    postings[term].append((doc_id, frequency))
+                documents.append({
+                    "source": os.path.relpath(path, corpus_dir),
+                    "title": _title(path, text),
+                    "offset": offset,
+                    "bytes": len(data),
+                    "tokens": sum(terms.values()),
+                })
+                offset += len(data)
+
+        # Postings are appended in doc id order, so each term's list is sorted
+        packed, lexicon = array("I"), {}
+        for term in sorted(postings):
+            lexicon[term] = (len(packed) // 2, len(postings[term]))
+            for doc_id, frequency in postings[term]:
+                packed.append(doc_id)
+                packed.append(frequency)
+
+        postings_tmp = os.path.join(index_dir, POSTINGS_FILE + ".tmp")
+        with open(postings_tmp, "wb") as out:
+            packed.tofile(out)
+
+        index_tmp = os.path.join(index_dir, INDEX_FILE + ".tmp")
+        with open(index_tmp, "w", encoding="utf-8") as out:
+            json.dump({
+                "version": INDEX_VERSION,
+                "byteorder": sys.byteorder,
+                "average_length": sum(d["tokens"] for d in documents) / len(documents) if documents else 0.0,
+                "documents": documents,
+                "terms": lexicon,
+            }, out)
+
+        # Swap the new files in only once all of them are written
+        os.replace(documents_tmp, os.path.join(index_dir, DOCUMENTS_FILE))
+        os.replace(postings_tmp, os.path.join(index_dir, POSTINGS_FILE))
+        os.replace(index_tmp, os.path.join(index_dir, INDEX_FILE))
+        return cls(index_dir)
+
+    @classmethod
+    def open_or_build(cls, index_dir: str, corpus_dir: Optional[str] = None) -> "LocalBM25Index":
+        """Open the index, building it from `corpus_dir` first if it does not exist."""
+
+        if not os.path.exists(os.path.join(index_dir, INDEX_FILE)):
+            if not corpus_dir:
+                raise FileNotFoundError(f"No index at {index_dir} and no corpus directory to build it from")
+            return cls.build(corpus_dir, index_dir)
+        return cls(index_dir)
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        """Top `k` (doc id, BM25 score) pairs for `query`."""
+
+        n = len(self.documents)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            offset, frequency_docs = entry
+            idf = math.log(1 + (n - frequency_docs + 0.5) / (frequency_docs + 0.5))
+            postings = self._postings[2 * offset:2 * (offset + frequency_docs)]
+            for i in range(0, 2 * frequency_docs, 2):
+                doc_id, frequency = postings[i], postings[i + 1]
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self.average_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def document(self, doc_id: int) -> dict:
+        """Source, title and text of a document."""
+
+        doc = self.documents[doc_id]
+        start = doc["offset"]
+        content = self._documents_map[start:start + doc["bytes"]].decode("utf-8") if self._documents_map else ""
+        return {"source": doc["source"], "title": doc["title"], "content": content}
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self.documents),
+            "terms": len(self.terms),
+            "postings_bytes": len(self._postings_map) if self._postings_map else 0,
+            "documents_bytes": len(self._documents_map) if self._documents_map else 0,
+        }
+
+    def close(self) -> None:
+        # The postings view must be released before its mmap can close
+        self._postings.release()
+        for mapped in (self._postings_map, self._documents_map):
+            if mapped is not None:
+                mapped.close()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build or query a local BM25 index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Index a corpus directory")
+    build.add_argument("corpus_dir")
+    build.add_argument("index_dir")
+    build.add_argument("--ext", action="append", help="File extension to index (repeatable)")
+    search = commands.add_parser("search", help="Query an index")
+    search.add_argument("index_dir")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "build":
+        index = LocalBM25Index.build(args.corpus_dir, args.index_dir, args.ext or DEFAULT_EXTENSIONS)
+        print(f"indexed {index.stats()} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    else:
+        index = LocalBM25Index(args.index_dir)
+        hits = index.search(args.query, args.k)
+        elapsed = time.perf_counter() - start
+        for doc_id, score in hits:
+            doc = index.document(doc_id)
+            print(f"{score:8.3f}  {doc['source']}  {doc['title']}")
+        print(f"{len(hits)} hits in {elapsed * 1000:.2f} ms")
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,12 @@ from typing_extensions import TypedDict
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, SystemMessage
 
-from langchain_community.document_loaders import WikipediaLoader
-from langchain_tavily import TavilySearch  # updated 1.0
-
 from langchain_openai import ChatOpenAI
 
 from langgraph.graph import StateGraph, START, END
 
+from retrieval import RetrievalBackend, format_documents, get_retrieval_backends
+
 llm = ChatOpenAI(model="gpt-4o", temperature=0) 
 
 class State(TypedDict):
@@ -19,42 +18,23 @@ class State(TypedDict):
     answer: str
     context: Annotated[list, operator.add]
 
-def search_web(state):
+def retrieval_node(backend: RetrievalBackend):
     
-    """ Retrieve docs from web search """
-
-    # Search
-    tavily_search = TavilySearch(max_results=3)
-    data = tavily_search.invoke({"query": state['question']})
-    search_docs = data.get("results", data)
+    """ Build the node that retrieves docs for the question from `backend` """
 
-     # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document href="{doc["url"]}"/>\n{doc["content"]}\n</Document>'
-            for doc in search_docs
-        ]
-    )
+    def retrieve(state):
 
-    return {"context": [formatted_search_docs]} 
-
-def search_wikipedia(state):
-    
-    """ Retrieve docs from wikipedia """
+        # Search
+        search_docs = backend.search(state['question'])
 
-    # Search
-    search_docs = WikipediaLoader(query=state['question'], 
-                                  load_max_docs=2).load()
+        # Format
+        return {"context": [format_documents(search_docs)]}
 
-     # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document source="{doc.metadata["source"]}" page="{doc.metadata.get("page", "")}"/>\n{doc.page_content}\n</Document>'
-            for doc in search_docs
-        ]
-    )
+    retrieve.__name__ = f"search_{backend.name}"
+    return retrieve
 
-    return {"context": [formatted_search_docs]} 
+# One retrieval node per backend in RETRIEVAL_BACKENDS (search_web and search_wikipedia by default)
+retrieval_nodes = {f"search_{backend.name}": retrieval_node(backend) for backend in get_retrieval_backends()}
 
 def generate_answer(state):
     
@@ -79,14 +59,13 @@ def generate_answer(state):
 builder = StateGraph(State)
 
 # Initialize each node with node_secret 
-builder.add_node("search_web",search_web)
-builder.add_node("search_wikipedia", search_wikipedia)
+for name, node in retrieval_nodes.items():
+    builder.add_node(name, node)
 builder.add_node("generate_answer", generate_answer)
 
 # Flow
-builder.add_edge(START, "search_wikipedia")
-builder.add_edge(START, "search_web")
-builder.add_edge("search_wikipedia", "generate_answer")
-builder.add_edge("search_web", "generate_answer")
+for name in retrieval_nodes:
+    builder.add_edge(START, name)
+    builder.add_edge(name, "generate_answer")
 builder.add_edge("generate_answer", END)
 graph = builder.compile()
@@ -0,0 +1,110 @@
+"""Progressive assembly of the research assistant's final report.
+
+The reduce phase writes the introduction, body and conclusion in parallel and
+only joins them in `finalize_report`. The writer nodes call the model through
+`invoke`, which LangGraph streams token by token when a client asks for
+`stream_mode="messages"`. This module turns those tokens back into a report
+while it is being written:
+
+- `assemble_report` is the single place the three parts are joined; both
+  `finalize_report` and the client-side assembler use it
+- `ReportAssembler` consumes ("messages", ...) and ("updates", ...) stream
+  events and renders the report so far
+- `stream_report` / `astream_report` drive a graph and yield the report after
+  every new token, so clients can show the report as soon as the first token
+  arrives instead of waiting for `finalize_report`
+
+Example (after approving the analysts):
+
+    for report in stream_report(graph, None, thread):
+        print(report)
+"""
+
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+# Writer node -> report part it produces
+REPORT_PARTS = {
+    "write_introduction": "introduction",
+    "write_report": "content",
+    "write_conclusion": "conclusion",
+}
+
+def assemble_report(introduction: str, content: str, conclusion: str) -> str:
+    """Join the report parts, moving the body's sources to the end of the report."""
+
+    if content.startswith("## Insights"):
+        content = content.strip("## Insights")
+    if "## Sources" in content:
+        try:
+            content, sources = content.split("\n## Sources\n")
+        except:
+            sources = None
+    else:
+        sources = None
+
+    final_report = introduction + "\n\n---\n\n" + content + "\n\n---\n\n" + conclusion
+    if sources is not None:
+        final_report += "\n\n## Sources\n" + sources
+    return final_report
+
+class ReportAssembler:
+    """Builds the final report from streamed writer-node output."""
+
+    def __init__(self):
+        self.parts: Dict[str, str] = {part: "" for part in REPORT_PARTS.values()}
+        self.finished: Dict[str, bool] = {part: False for part in REPORT_PARTS.values()}
+        self.final_report: Optional[str] = None
+
+    def feed(self, mode: str, payload: Any) -> Optional[str]:
+        """Apply one stream event; returns the name of the part that changed, if any."""
+
+        if mode == "messages":
+            chunk, metadata = payload
+            part = REPORT_PARTS.get(metadata.get("langgraph_node"))
+            # Ignore model calls made inside the interview subgraphs
+            if part is None or self.finished[part] or "|" in metadata.get("langgraph_checkpoint_ns", ""):
+                return None
+            if isinstance(chunk.content, str) and chunk.content:
+                self.parts[part] += chunk.content
+                return part
+            return None
+
+        if mode == "updates":
+            for node, update in (payload or {}).items():
+                if node == "finalize_report" and update:
+                    self.final_report = update["final_report"]
+                    return "final_report"
+                part = REPORT_PARTS.get(node)
+                # The node's return value is authoritative (e.g. on a cache hit nothing was streamed)
+                if part is not None and update:
+                    self.parts[part] = update[part]
+                    self.finished[part] = True
+                    return part
+        return None
+
+    def render(self) -> str:
+        """The report so far: the final report once available, else the streamed parts."""
+
+        if self.final_report is not None:
+            return self.final_report
+        return assemble_report(self.parts["introduction"], self.parts["content"], self.parts["conclusion"])
+
+def _split(event: Tuple) -> Tuple[str, Any]:
+    # With subgraphs=True events are (namespace, mode, payload)
+    return event[-2], event[-1]
+
+def stream_report(graph, graph_input: Any, config: dict) -> Iterator[str]:
+    """Run `graph` and yield the report each time a part of it changes."""
+
+    assembler = ReportAssembler()
+    for event in graph.stream(graph_input, config, stream_mode=["messages", "updates"]):
+        if assembler.feed(*_split(event)):
+            yield assembler.render()
+
+async def astream_report(graph, graph_input: Any, config: dict) -> AsyncIterator[str]:
+    """Async version of `stream_report`."""
+
+    assembler = ReportAssembler()
+    async for event in graph.astream(graph_input, config, stream_mode=["messages", "updates"]):
+        if assembler.feed(*_split(event)):
+            yield assembler.render()
@@ -3,17 +3,23 @@ from pydantic import BaseModel, Field
 from typing import Annotated, List
 from typing_extensions import TypedDict
 
-from langchain_community.document_loaders import WikipediaLoader
-from langchain_tavily import TavilySearch  # updated 1.0
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.messages import HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 
 from langgraph.constants import Send
 from langgraph.graph import END, MessagesState, START, StateGraph
 
+from context_packer import count_tokens, pack_context
+from document_store import DocumentStore, merge_doc_ids, merge_documents, register_documents
+from llm_cache import llm_cache
+from report_streaming import assemble_report
+from retrieval import RetrievalBackend, get_retrieval_backends
+from structured_output import structured_output
+
 ### LLM
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0) 
+llm = ChatOpenAI(model="gpt-4o", temperature=0, cache=llm_cache) 
 
 ### Schema 
 
@@ -47,7 +53,11 @@ class GenerateAnalystsState(TypedDict):
 
 class InterviewState(MessagesState):
     max_num_turns: int # Number turns of conversation
-    context: Annotated[list, operator.add] # Source docs
+    turn: Annotated[int, operator.add] # Questions asked so far, incremented by generate_question
+    num_responses: Annotated[int, operator.add] # Expert answers so far, incremented by generate_answer
+    search_query: str # Query written by plan_search for this turn, shared by the retrieval nodes
+    context: Annotated[list, merge_doc_ids] # Ids of source docs in `documents`
+    documents: Annotated[dict, merge_documents] # Source docs by id, each stored once
     analyst: Analyst # Analyst asking questions
     interview: str # Interview transcript
     sections: list # Final key we duplicate in outer state for Send() API
@@ -61,6 +71,9 @@ class ResearchGraphState(TypedDict):
     human_analyst_feedback: str # Human feedback
     analysts: List[Analyst] # Analyst asking questions
     sections: Annotated[list, operator.add] # Send() API key
+    documents: Annotated[dict, merge_documents] # Source docs of all interviews, by id
+    formatted_sections: str # All sections joined once for the report writers
+    sections_tokens: int # Token count of formatted_sections
     introduction: str # Introduction for the final report
     content: str # Content for the final report
     conclusion: str # Conclusion for the final report
@@ -92,7 +105,7 @@ def create_analysts(state: GenerateAnalystsState):
     human_analyst_feedback=state.get('human_analyst_feedback', '')
         
     # Enforce structured output
-    structured_llm = llm.with_structured_output(Perspectives)
+    structured_llm = structured_output(llm, Perspectives)
 
     # System message
     system_message = analyst_instructions.format(topic=topic,
@@ -140,8 +153,8 @@ def generate_question(state: InterviewState):
     system_message = question_instructions.format(goals=analyst.persona)
     question = llm.invoke([SystemMessage(content=system_message)]+messages)
         
-    # Write messages to state
-    return {"messages": [question]}
+    # Write messages to state and count the turn
+    return {"messages": [question], "turn": 1}
 
 # Search query writing
 search_instructions = SystemMessage(content=f"""You will be given a conversation between an analyst and an expert. 
@@ -154,52 +167,36 @@ Pay particular attention to the final question posed by the analyst.
 
 Convert this final question into a well-structured web search query""")
 
-def search_web(state: InterviewState):
-    
-    """ Retrieve docs from web search """
+def plan_search(state: InterviewState):
 
-    # Search
-    tavily_search = TavilySearch(max_results=3)
+    """ Node to write this turn's search query, once for all retrieval nodes """
 
     # Search query
-    structured_llm = llm.with_structured_output(SearchQuery)
+    structured_llm = structured_output(llm, SearchQuery)
     search_query = structured_llm.invoke([search_instructions]+state['messages'])
-    
-    # Search
-    data = tavily_search.invoke({"query": search_query.search_query})
-    search_docs = data.get("results", data)
-
-     # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document href="{doc["url"]}"/>\n{doc["content"]}\n</Document>'
-            for doc in search_docs
-        ]
-    )
 
-    return {"context": [formatted_search_docs]} 
+    return {"search_query": search_query.search_query}
 
-def search_wikipedia(state: InterviewState):
-    
-    """ Retrieve docs from wikipedia """
+def retrieval_node(backend: RetrievalBackend):
 
-    # Search query
-    structured_llm = llm.with_structured_output(SearchQuery)
-    search_query = structured_llm.invoke([search_instructions]+state['messages'])
-    
-    # Search
-    search_docs = WikipediaLoader(query=search_query.search_query, 
-                                  load_max_docs=2).load()
-
-     # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document source="{doc.metadata["source"]}" page="{doc.metadata.get("page", "")}"/>\n{doc.page_content}\n</Document>'
-            for doc in search_docs
-        ]
-    )
+    """ Build the node that retrieves docs for this turn's query from `backend` """
+
+    def retrieve(state: InterviewState):
 
-    return {"context": [formatted_search_docs]} 
+        # Search
+        search_docs = backend.search(state['search_query'])
+
+        # Store each document once in state and reference it by id
+        doc_ids, documents = register_documents(search_docs, state.get("documents"))
+
+        return {"context": doc_ids, "documents": documents}
+
+    retrieve.__name__ = f"search_{backend.name}"
+    return retrieve
+
+# Retrieval nodes run in parallel after plan_search, all using its query: one
+# per backend in RETRIEVAL_BACKENDS (search_web and search_wikipedia by default)
+retrieval_nodes = {f"search_{backend.name}": retrieval_node(backend) for backend in get_retrieval_backends()}
 
 # Generate expert answer
 answer_instructions = """You are an expert being interviewed by an analyst.
@@ -230,14 +227,16 @@ When answering questions, follow these guidelines:
         
 And skip the addition of the brackets as well as the Document source preamble in your citation."""
 
-def generate_answer(state: InterviewState):
+def generate_answer(state: InterviewState, config: RunnableConfig):
     
     """ Node to answer a question """
 
     # Get state
     analyst = state["analyst"]
     messages = state["messages"]
-    context = state["context"]
+
+    # Best matching chunks for the latest question, within the token budget
+    context = pack_context(DocumentStore(state.get("documents")), state["context"], messages[-1].content, config)
 
     # Answer question
     system_message = answer_instructions.format(goals=analyst.persona, context=context)
@@ -246,8 +245,8 @@ def generate_answer(state: InterviewState):
     # Name the message as coming from the expert
     answer.name = "expert"
     
-    # Append it to state
-    return {"messages": [answer]}
+    # Append it to state and count the answer
+    return {"messages": [answer], "num_responses": 1}
 
 def save_interview(state: InterviewState):
     
@@ -262,8 +261,7 @@ def save_interview(state: InterviewState):
     # Save to interviews key
     return {"interview": interview}
 
-def route_messages(state: InterviewState, 
-                   name: str = "expert"):
+def route_messages(state: InterviewState):
 
     """ Route between question and answer """
     
@@ -271,10 +269,8 @@ def route_messages(state: InterviewState,
     messages = state["messages"]
     max_num_turns = state.get('max_num_turns',2)
 
-    # Check the number of expert answers 
-    num_responses = len(
-        [m for m in messages if isinstance(m, AIMessage) and m.name == name]
-    )
+    # Number of expert answers, kept up to date by generate_answer
+    num_responses = state.get('num_responses', 0)
 
     # End if expert has answered more than the max turns
     if num_responses >= max_num_turns:
@@ -340,14 +336,14 @@ There should be no redundant sources. It should simply be:
 - Include no preamble before the title of the report
 - Check that all guidelines have been followed"""
 
-def write_section(state: InterviewState):
+def write_section(state: InterviewState, config: RunnableConfig):
 
     """ Node to write a section """
 
     # Get state
     interview = state["interview"]
-    context = state["context"]
     analyst = state["analyst"]
+    context = pack_context(DocumentStore(state.get("documents")), state["context"], analyst.description, config)
    
     # Write section using either the gathered source docs from interview (context) or the interview itself (interview)
     system_message = section_writer_instructions.format(focus=analyst.description)
@@ -359,18 +355,19 @@ def write_section(state: InterviewState):
 # Add nodes and edges 
 interview_builder = StateGraph(InterviewState)
 interview_builder.add_node("ask_question", generate_question)
-interview_builder.add_node("search_web", search_web)
-interview_builder.add_node("search_wikipedia", search_wikipedia)
+interview_builder.add_node("plan_search", plan_search)
+for name, node in retrieval_nodes.items():
+    interview_builder.add_node(name, node)
 interview_builder.add_node("answer_question", generate_answer)
 interview_builder.add_node("save_interview", save_interview)
 interview_builder.add_node("write_section", write_section)
 
 # Flow
 interview_builder.add_edge(START, "ask_question")
-interview_builder.add_edge("ask_question", "search_web")
-interview_builder.add_edge("ask_question", "search_wikipedia")
-interview_builder.add_edge("search_web", "answer_question")
-interview_builder.add_edge("search_wikipedia", "answer_question")
+interview_builder.add_edge("ask_question", "plan_search")
+for name in retrieval_nodes:
+    interview_builder.add_edge("plan_search", name)
+    interview_builder.add_edge(name, "answer_question")
 interview_builder.add_conditional_edges("answer_question", route_messages,['ask_question','save_interview'])
 interview_builder.add_edge("save_interview", "write_section")
 interview_builder.add_edge("write_section", END)
@@ -388,12 +385,35 @@ def initiate_all_interviews(state: ResearchGraphState):
     # Otherwise kick off interviews in parallel via Send() API
     else:
         topic = state["topic"]
+        documents = state.get("documents", {})
         return [Send("conduct_interview", {"analyst": analyst,
+                                           "documents": documents,
                                            "messages": [HumanMessage(
                                                content=f"So you said you were writing an article on {topic}?"
                                            )
                                                        ]}) for analyst in state["analysts"]]
 
+# Shared first message of the three report writer prompts
+sections_instructions = """Here are the memos written by a team of analysts. Each memo is a section of a report.
+
+{formatted_sections}"""
+
+def prepare_sections(state: ResearchGraphState):
+
+    """ Join all sections once for the report writers """
+
+    # Concat all sections together
+    formatted_sections = "\n\n".join([f"{section}" for section in state["sections"]])
+
+    return {"formatted_sections": formatted_sections,
+            "sections_tokens": count_tokens(formatted_sections)}
+
+def sections_message(state: ResearchGraphState):
+
+    """ The sections as the first prompt message, identical for every writer so providers can cache the prefix """
+
+    return SystemMessage(content=sections_instructions.format(formatted_sections=state["formatted_sections"]))
+
 # Write a report based on the interviews
 report_writer_instructions = """You are a technical writer creating a report on this overall topic: 
 
@@ -425,24 +445,17 @@ To format your report:
 [1] Source 1
 [2] Source 2
 
-Here are the memos from your analysts to build your report from: 
-
-{context}"""
+Build your report from the memos from your analysts provided above."""
 
 def write_report(state: ResearchGraphState):
 
     """ Node to write the final report body """
 
-    # Full set of sections
-    sections = state["sections"]
     topic = state["topic"]
 
-    # Concat all sections together
-    formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
-    
-    # Summarize the sections into a final report
-    system_message = report_writer_instructions.format(topic=topic, context=formatted_str_sections)    
-    report = llm.invoke([SystemMessage(content=system_message)]+[HumanMessage(content=f"Write a report based upon these memos.")]) 
+    # Summarize the sections into a final report, with the shared sections first
+    system_message = report_writer_instructions.format(topic=topic)    
+    report = llm.invoke([sections_message(state), SystemMessage(content=system_message)]+[HumanMessage(content=f"Write a report based upon these memos.")]) 
     return {"content": report.content}
 
 # Write the introduction or conclusion
@@ -466,61 +479,36 @@ For your introduction, use ## Introduction as the section header.
 
 For your conclusion, use ## Conclusion as the section header.
 
-Here are the sections to reflect on for writing: {formatted_str_sections}"""
+Reflect on the sections provided above for writing."""
 
 def write_introduction(state: ResearchGraphState):
 
     """ Node to write the introduction """
 
-    # Full set of sections
-    sections = state["sections"]
     topic = state["topic"]
 
-    # Concat all sections together
-    formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
-    
-    # Summarize the sections into a final report
-    
-    instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_str_sections)    
-    intro = llm.invoke([instructions]+[HumanMessage(content=f"Write the report introduction")]) 
+    # Summarize the sections into a final report, with the shared sections first
+    instructions = intro_conclusion_instructions.format(topic=topic)    
+    intro = llm.invoke([sections_message(state), SystemMessage(content=instructions)]+[HumanMessage(content=f"Write the report introduction")]) 
     return {"introduction": intro.content}
 
 def write_conclusion(state: ResearchGraphState):
 
     """ Node to write the conclusion """
 
-    # Full set of sections
-    sections = state["sections"]
     topic = state["topic"]
 
-    # Concat all sections together
-    formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
-    
-    # Summarize the sections into a final report
-    
-    instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_str_sections)    
-    conclusion = llm.invoke([instructions]+[HumanMessage(content=f"Write the report conclusion")]) 
+    # Summarize the sections into a final report, with the shared sections first
+    instructions = intro_conclusion_instructions.format(topic=topic)    
+    conclusion = llm.invoke([sections_message(state), SystemMessage(content=instructions)]+[HumanMessage(content=f"Write the report conclusion")]) 
     return {"conclusion": conclusion.content}
 
 def finalize_report(state: ResearchGraphState):
 
     """ The is the "reduce" step where we gather all the sections, combine them, and reflect on them to write the intro/conclusion """
 
-    # Save full final report
-    content = state["content"]
-    if content.startswith("## Insights"):
-        content = content.strip("## Insights")
-    if "## Sources" in content:
-        try:
-            content, sources = content.split("\n## Sources\n")
-        except:
-            sources = None
-    else:
-        sources = None
-
-    final_report = state["introduction"] + "\n\n---\n\n" + content + "\n\n---\n\n" + state["conclusion"]
-    if sources is not None:
-        final_report += "\n\n## Sources\n" + sources
+    # Save full final report (clients can assemble it progressively with report_streaming)
+    final_report = assemble_report(state["introduction"], state["content"], state["conclusion"])
     return {"final_report": final_report}
 
 # Add nodes and edges 
@@ -528,6 +516,7 @@ builder = StateGraph(ResearchGraphState)
 builder.add_node("create_analysts", create_analysts)
 builder.add_node("human_feedback", human_feedback)
 builder.add_node("conduct_interview", interview_builder.compile())
+builder.add_node("prepare_sections", prepare_sections)
 builder.add_node("write_report",write_report)
 builder.add_node("write_introduction",write_introduction)
 builder.add_node("write_conclusion",write_conclusion)
@@ -537,9 +526,10 @@ builder.add_node("finalize_report",finalize_report)
 builder.add_edge(START, "create_analysts")
 builder.add_edge("create_analysts", "human_feedback")
 builder.add_conditional_edges("human_feedback", initiate_all_interviews, ["create_analysts", "conduct_interview"])
-builder.add_edge("conduct_interview", "write_report")
-builder.add_edge("conduct_interview", "write_introduction")
-builder.add_edge("conduct_interview", "write_conclusion")
+builder.add_edge("conduct_interview", "prepare_sections")
+builder.add_edge("prepare_sections", "write_report")
+builder.add_edge("prepare_sections", "write_introduction")
+builder.add_edge("prepare_sections", "write_conclusion")
 builder.add_edge(["write_conclusion", "write_report", "write_introduction"], "finalize_report")
 builder.add_edge("finalize_report", END)
 
@@ -0,0 +1,258 @@
+import asyncio
+import os
+import weakref
+from contextlib import asynccontextmanager
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+
+from langgraph.graph import END, START, StateGraph
+
+from context_packer import pack_context
+from document_store import DocumentStore, register_documents
+from retrieval import RetrievalBackend, get_retrieval_backends
+from structured_output import structured_output
+
+from research_assistant import (
+    GenerateAnalystsState,
+    InterviewState,
+    Perspectives,
+    ResearchGraphState,
+    SearchQuery,
+    analyst_instructions,
+    answer_instructions,
+    finalize_report,
+    human_feedback,
+    initiate_all_interviews,
+    intro_conclusion_instructions,
+    llm,
+    prepare_sections,
+    question_instructions,
+    report_writer_instructions,
+    route_messages,
+    save_interview,
+    search_instructions,
+    section_writer_instructions,
+    sections_message,
+)
+
+### Concurrency limits
+
+# Defaults for the number of LLM / search requests in flight at once across all
+# interviews. Override per run with config["configurable"]["max_llm_calls"] and
+# config["configurable"]["max_search_calls"]. The limits are per event loop:
+# concurrent runs on one loop with the same limit share its slots.
+DEFAULT_MAX_LLM_CALLS = int(os.environ.get("RESEARCH_MAX_LLM_CALLS", 8))
+DEFAULT_MAX_SEARCH_CALLS = int(os.environ.get("RESEARCH_MAX_SEARCH_CALLS", 4))
+
+# Semaphores are bound to an event loop, so keep one set per loop
+_semaphores = weakref.WeakKeyDictionary()
+
+@asynccontextmanager
+async def limit(config: RunnableConfig, kind: str):
+
+    """ Hold one slot of the `llm` or `search` semaphore (per event loop, shared by runs with the same limit) """
+
+    configurable = (config or {}).get("configurable", {})
+    default = DEFAULT_MAX_LLM_CALLS if kind == "llm" else DEFAULT_MAX_SEARCH_CALLS
+    size = int(configurable.get(f"max_{kind}_calls", default))
+
+    loop_semaphores = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = loop_semaphores.get((kind, size))
+    if semaphore is None:
+        semaphore = loop_semaphores[(kind, size)] = asyncio.Semaphore(size)
+
+    async with semaphore:
+        yield
+
+async def ainvoke_llm(runnable, messages, config: RunnableConfig):
+
+    """ Call the LLM (or a structured output runnable) under the LLM limit """
+
+    async with limit(config, "llm"):
+        return await runnable.ainvoke(messages)
+
+### Nodes and edges
+
+async def create_analysts(state: GenerateAnalystsState, config: RunnableConfig):
+
+    """ Create analysts """
+
+    topic=state['topic']
+    max_analysts=state['max_analysts']
+    human_analyst_feedback=state.get('human_analyst_feedback', '')
+
+    # Enforce structured output
+    structured_llm = structured_output(llm, Perspectives)
+
+    # System message
+    system_message = analyst_instructions.format(topic=topic,
+                                                 human_analyst_feedback=human_analyst_feedback,
+                                                 max_analysts=max_analysts)
+
+    # Generate question
+    analysts = await ainvoke_llm(structured_llm, [SystemMessage(content=system_message)]+[HumanMessage(content="Generate the set of analysts.")], config)
+
+    # Write the list of analysis to state
+    return {"analysts": analysts.analysts}
+
+async def generate_question(state: InterviewState, config: RunnableConfig):
+
+    """ Node to generate a question """
+
+    # Get state
+    analyst = state["analyst"]
+    messages = state["messages"]
+
+    # Generate question
+    system_message = question_instructions.format(goals=analyst.persona)
+    question = await ainvoke_llm(llm, [SystemMessage(content=system_message)]+messages, config)
+
+    # Write messages to state and count the turn
+    return {"messages": [question], "turn": 1}
+
+async def plan_search(state: InterviewState, config: RunnableConfig):
+
+    """ Node to write this turn's search query, once for all retrieval nodes """
+
+    # Search query
+    structured_llm = structured_output(llm, SearchQuery)
+    search_query = await ainvoke_llm(structured_llm, [search_instructions]+state['messages'], config)
+
+    return {"search_query": search_query.search_query}
+
+def retrieval_node(backend: RetrievalBackend):
+
+    """ Build the node that retrieves docs for this turn's query from `backend` """
+
+    async def retrieve(state: InterviewState, config: RunnableConfig):
+
+        # Search
+        async with limit(config, "search"):
+            search_docs = await backend.asearch(state['search_query'])
+
+        # Store each document once in state and reference it by id
+        doc_ids, documents = register_documents(search_docs, state.get("documents"))
+
+        return {"context": doc_ids, "documents": documents}
+
+    retrieve.__name__ = f"search_{backend.name}"
+    return retrieve
+
+# Retrieval nodes run in parallel after plan_search, all using its query
+retrieval_nodes = {f"search_{backend.name}": retrieval_node(backend) for backend in get_retrieval_backends()}
+
+async def generate_answer(state: InterviewState, config: RunnableConfig):
+
+    """ Node to answer a question """
+
+    # Get state
+    analyst = state["analyst"]
+    messages = state["messages"]
+
+    # Best matching chunks for the latest question, within the token budget
+    context = pack_context(DocumentStore(state.get("documents")), state["context"], messages[-1].content, config)
+
+    # Answer question
+    system_message = answer_instructions.format(goals=analyst.persona, context=context)
+    answer = await ainvoke_llm(llm, [SystemMessage(content=system_message)]+messages, config)
+
+    # Name the message as coming from the expert
+    answer.name = "expert"
+
+    # Append it to state and count the answer
+    return {"messages": [answer], "num_responses": 1}
+
+async def write_section(state: InterviewState, config: RunnableConfig):
+
+    """ Node to write a section """
+
+    # Get state
+    interview = state["interview"]
+    analyst = state["analyst"]
+    context = pack_context(DocumentStore(state.get("documents")), state["context"], analyst.description, config)
+
+    # Write section using either the gathered source docs from interview (context) or the interview itself (interview)
+    system_message = section_writer_instructions.format(focus=analyst.description)
+    section = await ainvoke_llm(llm, [SystemMessage(content=system_message)]+[HumanMessage(content=f"Use this source to write your section: {context}")], config)
+
+    # Append it to state
+    return {"sections": [section.content]}
+
+# Add nodes and edges
+interview_builder = StateGraph(InterviewState)
+interview_builder.add_node("ask_question", generate_question)
+interview_builder.add_node("plan_search", plan_search)
+for name, node in retrieval_nodes.items():
+    interview_builder.add_node(name, node)
+interview_builder.add_node("answer_question", generate_answer)
+interview_builder.add_node("save_interview", save_interview)
+interview_builder.add_node("write_section", write_section)
+
+# Flow
+interview_builder.add_edge(START, "ask_question")
+interview_builder.add_edge("ask_question", "plan_search")
+for name in retrieval_nodes:
+    interview_builder.add_edge("plan_search", name)
+    interview_builder.add_edge(name, "answer_question")
+interview_builder.add_conditional_edges("answer_question", route_messages,['ask_question','save_interview'])
+interview_builder.add_edge("save_interview", "write_section")
+interview_builder.add_edge("write_section", END)
+
+async def write_report(state: ResearchGraphState, config: RunnableConfig):
+
+    """ Node to write the final report body """
+
+    topic = state["topic"]
+
+    # Summarize the sections into a final report, with the shared sections first
+    system_message = report_writer_instructions.format(topic=topic)
+    report = await ainvoke_llm(llm, [sections_message(state), SystemMessage(content=system_message)]+[HumanMessage(content=f"Write a report based upon these memos.")], config)
+    return {"content": report.content}
+
+async def write_introduction(state: ResearchGraphState, config: RunnableConfig):
+
+    """ Node to write the introduction """
+
+    topic = state["topic"]
+
+    # Summarize the sections into a final report, with the shared sections first
+    instructions = intro_conclusion_instructions.format(topic=topic)
+    intro = await ainvoke_llm(llm, [sections_message(state), SystemMessage(content=instructions)]+[HumanMessage(content=f"Write the report introduction")], config)
+    return {"introduction": intro.content}
+
+async def write_conclusion(state: ResearchGraphState, config: RunnableConfig):
+
+    """ Node to write the conclusion """
+
+    topic = state["topic"]
+
+    # Summarize the sections into a final report, with the shared sections first
+    instructions = intro_conclusion_instructions.format(topic=topic)
+    conclusion = await ainvoke_llm(llm, [sections_message(state), SystemMessage(content=instructions)]+[HumanMessage(content=f"Write the report conclusion")], config)
+    return {"conclusion": conclusion.content}
+
+# Add nodes and edges
+builder = StateGraph(ResearchGraphState)
+builder.add_node("create_analysts", create_analysts)
+builder.add_node("human_feedback", human_feedback)
+builder.add_node("conduct_interview", interview_builder.compile())
+builder.add_node("prepare_sections", prepare_sections)
+builder.add_node("write_report",write_report)
+builder.add_node("write_introduction",write_introduction)
+builder.add_node("write_conclusion",write_conclusion)
+builder.add_node("finalize_report",finalize_report)
+
+# Logic
+builder.add_edge(START, "create_analysts")
+builder.add_edge("create_analysts", "human_feedback")
+builder.add_conditional_edges("human_feedback", initiate_all_interviews, ["create_analysts", "conduct_interview"])
+builder.add_edge("conduct_interview", "prepare_sections")
+builder.add_edge("prepare_sections", "write_report")
+builder.add_edge("prepare_sections", "write_introduction")
+builder.add_edge("prepare_sections", "write_conclusion")
+builder.add_edge(["write_conclusion", "write_report", "write_introduction"], "finalize_report")
+builder.add_edge("finalize_report", END)
+
+# Compile
+graph = builder.compile(interrupt_before=['human_feedback'])
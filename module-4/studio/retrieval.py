@@ -0,0 +1,142 @@
+"""Pluggable retrieval backends for the research graphs.
+
+Every backend answers `search(query)` with a list of Documents, so graphs can
+add one retrieval node per backend instead of hard-coding Tavily and
+Wikipedia:
+
+- `web`: Tavily web search through the shared search client
+- `wikipedia`: Wikipedia through the shared search client
+- `local`: a `LocalBM25Index` built over a directory of documents, for runs
+  against an internal corpus without network access
+
+Documents carry `source` in their metadata (and `url` for web results), which
+`document_header` turns into the <Document .../> tags the prompts cite.
+
+Environment:
+- RETRIEVAL_BACKENDS: comma separated backend names (default "web,wikipedia")
+- LOCAL_INDEX_PATH: index directory for the local backend (default ./state_db/local_index)
+- LOCAL_CORPUS_PATH: corpus to build the local index from when it does not exist yet
+"""
+
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+from local_index import LocalBM25Index
+from search_clients import get_search_client
+
+DEFAULT_BACKENDS = os.environ.get("RETRIEVAL_BACKENDS", "web,wikipedia")
+LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", "./state_db/local_index")
+LOCAL_CORPUS_PATH = os.environ.get("LOCAL_CORPUS_PATH")
+
+class RetrievalBackend(ABC):
+    """Base class: returns up to `k` Documents for a query."""
+
+    name = "base"
+
+    def __init__(self, k: int = 3):
+        self.k = k
+
+    @abstractmethod
+    def search(self, query: str, k: Optional[int] = None) -> List[Document]:
+        """Up to `k` (default `self.k`) Documents for `query`, best first."""
+
+    async def asearch(self, query: str, k: Optional[int] = None) -> List[Document]:
+        return await asyncio.to_thread(self.search, query, k)
+
+class WebSearchBackend(RetrievalBackend):
+    """Tavily web search."""
+
+    name = "web"
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Document]:
+        return self._documents(get_search_client().search_web(query, max_results=k or self.k))
+
+    async def asearch(self, query: str, k: Optional[int] = None) -> List[Document]:
+        return self._documents(await get_search_client().asearch_web(query, max_results=k or self.k))
+
+    @staticmethod
+    def _documents(results: List[dict]) -> List[Document]:
+        return [
+            Document(page_content=doc["content"],
+                     metadata={"source": doc["url"], "url": doc["url"], "title": doc.get("title", "")})
+            for doc in results
+        ]
+
+class WikipediaBackend(RetrievalBackend):
+    """Wikipedia pages."""
+
+    name = "wikipedia"
+
+    def __init__(self, k: int = 2):
+        super().__init__(k)
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Document]:
+        return get_search_client().search_wikipedia(query, load_max_docs=k or self.k)
+
+    async def asearch(self, query: str, k: Optional[int] = None) -> List[Document]:
+        return await get_search_client().asearch_wikipedia(query, load_max_docs=k or self.k)
+
+class LocalIndexBackend(RetrievalBackend):
+    """BM25 search over a local on-disk index."""
+
+    name = "local"
+
+    def __init__(self, index: LocalBM25Index, k: int = 3):
+        super().__init__(k)
+        self.index = index
+
+    @classmethod
+    def from_env(cls) -> "LocalIndexBackend":
+        return cls(LocalBM25Index.open_or_build(LOCAL_INDEX_PATH, LOCAL_CORPUS_PATH))
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Document]:
+        documents = []
+        for doc_id, score in self.index.search(query, k or self.k):
+            doc = self.index.document(doc_id)
+            documents.append(Document(page_content=doc["content"],
+                                      metadata={"source": doc["source"], "title": doc["title"], "score": score}))
+        return documents
+
+    async def asearch(self, query: str, k: Optional[int] = None) -> List[Document]:
+        # Memory-mapped lookups take milliseconds; not worth a thread hop
+        return self.search(query, k)
+
+BACKENDS = {
+    "web": WebSearchBackend,
+    "wikipedia": WikipediaBackend,
+    "local": LocalIndexBackend.from_env,
+}
+
+_backends: Dict[str, RetrievalBackend] = {}
+
+def get_backend(name: str) -> RetrievalBackend:
+    """Shared backend instance by name."""
+
+    if name not in _backends:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown retrieval backend {name!r}, expected one of {sorted(BACKENDS)}")
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+def get_retrieval_backends(names: Optional[Iterable[str]] = None) -> List[RetrievalBackend]:
+    """Backends named in `names`, defaulting to RETRIEVAL_BACKENDS."""
+
+    if names is None:
+        names = DEFAULT_BACKENDS.split(",")
+    return [get_backend(name.strip()) for name in names if name.strip()]
+
+def document_header(doc: Document) -> str:
+    """Opening <Document .../> tag for a retrieved document."""
+
+    if "url" in doc.metadata:
+        return f'<Document href="{doc.metadata["url"]}"/>'
+    return f'<Document source="{doc.metadata["source"]}" page="{doc.metadata.get("page", "")}"/>'
+
+def format_documents(docs: Iterable[Document]) -> str:
+    """Render documents in the <Document ...> format the prompts expect."""
+
+    return "\n\n---\n\n".join(f"{document_header(doc)}\n{doc.page_content}\n</Document>" for doc in docs)
@@ -11,6 +11,8 @@ load_dotenv(env_path)
 
 from langchain_community.chat_models import ChatTongyi
 
+from structured_output import structured_output
+
 # Prompts we will use
 subjects_prompt = """Generate a list of 3 sub-topics that are all related to this overall topic: {topic}."""
 joke_prompt = """Generate a joke about {subject}"""
@@ -41,7 +43,7 @@ class OverallState(TypedDict):
 
 def generate_topics(state: OverallState):
     prompt = subjects_prompt.format(topic=state["topic"])
-    response = model.with_structured_output(Subjects).invoke(prompt)
+    response = structured_output(model, Subjects).invoke(prompt)
     return {"subjects": response.subjects}
 
 from langgraph.types import Send
@@ -56,14 +58,14 @@ class Joke(BaseModel):
 
 def generate_joke(state: JokeState):
     prompt = joke_prompt.format(subject=state["subject"])
-    response = model.with_structured_output(Joke).invoke(prompt)
+    response = structured_output(model, Joke).invoke(prompt)
     print(f"subject: {state['subject']}, ------ joke: {response.joke}")
     return {"jokes": [response.joke]}
 
 def best_joke(state: OverallState):
     jokes = "\n\n".join(state["jokes"])
     prompt = best_joke_prompt.format(topic=state["topic"], jokes=jokes)
-    response = model.with_structured_output(BestJoke).invoke(prompt)
+    response = structured_output(model, BestJoke).invoke(prompt)
     return {"best_selected_joke": state["jokes"][response.id]}
 
 from langgraph.graph import END, StateGraph, START
@@ -14,8 +14,6 @@ from pydantic import BaseModel, Field
 from typing import Annotated, List
 from typing_extensions import TypedDict
 
-from langchain_community.document_loaders import WikipediaLoader
-from langchain_tavily import TavilySearch  # updated 1.0
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, get_buffer_string
 
 from langgraph.constants import Send
@@ -23,6 +21,9 @@ from langgraph.graph import END, MessagesState, START, StateGraph
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_community.chat_models import ChatTongyi
 
+from search_clients import get_search_client
+from structured_output import structured_output
+
 # LLM
 llm = ChatTongyi(
     model="qwen-plus",  # 或 "qwen-turbo", "qwen-max" 等
@@ -97,7 +98,7 @@ def create_analysts(state: GenerateAnalystsState):
     human_analyst_feedback=state.get('human_analyst_feedback', '')
         
     # Enforce structured output
-    structured_llm = llm.with_structured_output(Perspectives)
+    structured_llm = structured_output(llm, Perspectives)
 
     # System message
     system_message = analyst_instructions.format(topic=topic,
@@ -187,16 +188,12 @@ def search_web(state: InterviewState):
     
     """ Retrieve docs from web search """
 
-    # Search
-    tavily_search = TavilySearch(max_results=3)
-
     # Search query
-    structured_llm = llm.with_structured_output(SearchQuery)
+    structured_llm = structured_output(llm, SearchQuery)
     search_query = structured_llm.invoke([search_instructions]+state['messages'])
     
     # Search
-    data = tavily_search.invoke({"query": search_query.search_query})
-    search_docs = data.get("results", data)
+    search_docs = get_search_client().search_web(search_query.search_query, max_results=3)
 
      # Format
     formatted_search_docs = "\n\n---\n\n".join(
@@ -213,12 +210,12 @@ def search_wikipedia(state: InterviewState):
     """ Retrieve docs from wikipedia """
 
     # Search query
-    structured_llm = llm.with_structured_output(SearchQuery)
+    structured_llm = structured_output(llm, SearchQuery)
     search_query = structured_llm.invoke([search_instructions]+state['messages'])
     
     # Search
-    search_docs = WikipediaLoader(query=search_query.search_query, 
-                                  load_max_docs=2).load()
+    search_docs = get_search_client().search_wikipedia(search_query.search_query,
+                                                       load_max_docs=2)
 
      # Format
     formatted_search_docs = "\n\n---\n\n".join(
@@ -0,0 +1,233 @@
+"""Shared search clients for the module-4 graphs.
+
+Nodes used to build a new `TavilySearch` / `WikipediaLoader` on every call, which
+means a new client and HTTP connection (TLS handshake included) per search.
+This module keeps one client per process instead:
+
+- web searches go through one `TavilySearch` instance, built on first use
+- Wikipedia requests go through a pooled `requests.Session`, so connections
+  are kept alive and reused across nodes and threads
+- results are cached by normalized query, so analysts that ask the same thing
+  (or a retried node) do not pay for the search twice
+- a `stub` backend returns deterministic local results, for offline runs and
+  benchmarks
+
+Environment:
+- SEARCH_BACKEND=live (default) or stub
+- TAVILY_API_KEY is required for live web search (checked on the first web
+  search, so importing a graph never needs it)
+- SEARCH_CACHE_MAX_ITEMS sets the query cache size (default 512)
+- SEARCH_CACHE_TTL_SECONDS sets the query cache TTL (default 1 hour)
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from langchain_core.documents import Document
+from langchain_tavily import TavilySearch
+
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+WIKIPEDIA_USER_AGENT = "langchain-academy/1.0 (research assistant)"
+
+# Same page size as WikipediaLoader's default
+WIKIPEDIA_DOC_CHARS_MAX = 4000
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query used as the cache key."""
+
+    query = re.sub(r"\s+", " ", query or "").strip().lower()
+    return query.strip(" ?.!\"'")
+
+class QueryCache:
+    """Thread-safe LRU cache with a TTL for search results."""
+
+    def __init__(self, max_items: int = 512, ttl_seconds: Optional[float] = 3600):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                stored_at, value = item
+                if self.ttl_seconds is None or time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+class SearchClient:
+    """Pooled Tavily / Wikipedia client with a normalized-query result cache."""
+
+    def __init__(self, backend: str = "live", cache: Optional[QueryCache] = None, pool_size: int = 32,
+                 tavily_api_key: Optional[str] = None):
+        if backend not in ("live", "stub"):
+            raise ValueError(f"Unknown search backend: {backend}")
+        self.backend = backend
+        self.tavily_api_key = tavily_api_key
+        self.cache = cache or QueryCache()
+        self.requests_sent = 0
+        self._tavily_tools: Dict[int, TavilySearch] = {}
+        self._tavily_lock = threading.Lock()
+
+        # One keep-alive pool shared by every node and thread
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = WIKIPEDIA_USER_AGENT
+
+    @classmethod
+    def from_env(cls) -> "SearchClient":
+        cache = QueryCache(
+            max_items=int(os.environ.get("SEARCH_CACHE_MAX_ITEMS", 512)),
+            ttl_seconds=float(os.environ.get("SEARCH_CACHE_TTL_SECONDS", 3600)),
+        )
+        return cls(backend=os.environ.get("SEARCH_BACKEND", "live"), cache=cache,
+                   tavily_api_key=os.environ.get("TAVILY_API_KEY"))
+
+    def require_tavily(self) -> None:
+        """Raise a clear error if live web search has no API key."""
+
+        if self.backend == "live" and not self.tavily_api_key:
+            raise ValueError(
+                "Did not find TAVILY_API_KEY: set the environment variable for live web search, "
+                "or SEARCH_BACKEND=stub for offline runs")
+
+    def _cached(self, kind: str, query: str, limit: int, fetch) -> Any:
+        key = (kind, normalize_query(query), limit)
+        results = self.cache.get(key)
+        if results is None:
+            results = fetch(query, limit)
+            self.cache.put(key, results)
+        return list(results)
+
+    def _get(self, url: str, params: dict) -> dict:
+        self.requests_sent += 1
+        response = self.session.get(url, params=params, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    ## Web search
+
+    def search_web(self, query: str, max_results: int = 3) -> List[Dict[str, Any]]:
+        """Tavily search results as dicts with `url`, `title` and `content`."""
+
+        self.require_tavily()
+        fetch = self._stub_web if self.backend == "stub" else self._tavily
+        return self._cached("web", query, max_results, fetch)
+
+    def _tavily_tool(self, max_results: int) -> TavilySearch:
+        # max_results can only be set when TavilySearch is built, so keep one
+        # instance per result count (every graph asks for 3)
+        tool = self._tavily_tools.get(max_results)
+        if tool is None:
+            with self._tavily_lock:
+                tool = self._tavily_tools.get(max_results)
+                if tool is None:
+                    tool = self._tavily_tools[max_results] = TavilySearch(
+                        max_results=max_results, tavily_api_key=self.tavily_api_key)
+        return tool
+
+    def _tavily(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        self.requests_sent += 1
+        data = self._tavily_tool(max_results).invoke({"query": query})
+        if "error" in data:
+            raise data["error"]
+        return data.get("results", [])
+
+    def _stub_web(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        slug = re.sub(r"\W+", "-", normalize_query(query)).strip("-")
+        return [
+            {"url": f"https://example.com/{slug}/{i}", "title": f"{query} ({i})",
+             "content": f"Stub web result {i} for the query: {query}."}
+            for i in range(max_results)
+        ]
+
+    ## Wikipedia
+
+    def search_wikipedia(self, query: str, load_max_docs: int = 2) -> List[Document]:
+        """Wikipedia pages as Documents with the same metadata as WikipediaLoader."""
+
+        fetch = self._stub_wikipedia if self.backend == "stub" else self._wikipedia
+        return self._cached("wikipedia", query, load_max_docs, fetch)
+
+    def _wikipedia(self, query: str, load_max_docs: int) -> List[Document]:
+        # Search and page URLs in a single request
+        data = self._get(WIKIPEDIA_API_URL, {
+            "action": "query", "format": "json", "generator": "search",
+            "gsrsearch": query[:300], "gsrlimit": load_max_docs, "prop": "info", "inprop": "url",
+        })
+        pages = sorted(data.get("query", {}).get("pages", {}).values(), key=lambda page: page.get("index", 0))
+
+        docs = []
+        for page in pages:
+            # The API only returns one full-text extract per request
+            extract = self._get(WIKIPEDIA_API_URL, {
+                "action": "query", "format": "json", "prop": "extracts",
+                "explaintext": 1, "pageids": page["pageid"],
+            })
+            content = extract["query"]["pages"][str(page["pageid"])].get("extract", "")
+            docs.append(Document(
+                page_content=content[:WIKIPEDIA_DOC_CHARS_MAX],
+                metadata={"title": page["title"], "summary": content.split("\n\n", 1)[0], "source": page["fullurl"]},
+            ))
+        return docs
+
+    def _stub_wikipedia(self, query: str, load_max_docs: int) -> List[Document]:
+        slug = re.sub(r"\W+", "_", normalize_query(query)).strip("_")
+        return [
+            Document(page_content=f"Stub Wikipedia page {i} about {query}.",
+                     metadata={"title": f"{query} ({i})", "summary": f"Stub page {i}.",
+                               "source": f"https://en.wikipedia.org/wiki/{slug}_{i}"})
+            for i in range(load_max_docs)
+        ]
+
+    ## Async variants run on the pooled session in a worker thread
+
+    async def asearch_web(self, query: str, max_results: int = 3) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search_web, query, max_results)
+
+    async def asearch_wikipedia(self, query: str, load_max_docs: int = 2) -> List[Document]:
+        return await asyncio.to_thread(self.search_wikipedia, query, load_max_docs)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "requests_sent": self.requests_sent,
+        }
+
+_client: Optional[SearchClient] = None
+_client_lock = threading.Lock()
+
+def get_search_client() -> SearchClient:
+    """Process-wide search client, created on first use."""
+
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SearchClient.from_env()
+    return _client
@@ -0,0 +1,71 @@
+"""Registry of precompiled structured-output runnables.
+
+`llm.with_structured_output(Schema)` converts the pydantic schema to a JSON
+schema, binds it as a tool and builds a parser chain. Doing that inside a node
+repeats the work on every call. `structured_output(llm, Schema)` builds each
+(model, schema) pair once and hands back the same runnable afterwards.
+
+`structured_output_registry.stats()` reports how often a compiled runnable was
+reused and the build time this saved, using each pair's measured build time.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+class StructuredOutputRegistry:
+    """Caches `model.with_structured_output(schema)` per (model, schema, options)."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model, schema, **kwargs):
+        # Models are not hashable, so key on identity and keep a reference to the
+        # model in the entry so its id cannot be reused while cached
+        key = (id(model), schema, tuple(sorted(kwargs.items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["model"] is model:
+                entry["hits"] += 1
+                return entry["runnable"]
+
+        start = time.perf_counter()
+        runnable = model.with_structured_output(schema, **kwargs)
+        build_seconds = time.perf_counter() - start
+
+        with self._lock:
+            # Another thread may have built the same pair meanwhile; keep the first
+            entry = self._entries.get(key)
+            if entry is None or entry["model"] is not model:
+                entry = self._entries[key] = {
+                    "model": model,
+                    "runnable": runnable,
+                    "build_seconds": build_seconds,
+                    "hits": 0,
+                }
+            return entry["runnable"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = [(key[1], dict(entry)) for key, entry in self._entries.items()]
+        return {
+            "runnables": len(entries),
+            "hits": sum(e["hits"] for _, e in entries),
+            "build_ms": round(sum(e["build_seconds"] for _, e in entries) * 1000, 3),
+            "saved_ms": round(sum(e["hits"] * e["build_seconds"] for _, e in entries) * 1000, 3),
+            "schemas": {
+                getattr(schema, "__name__", str(schema)): {
+                    "build_ms": round(e["build_seconds"] * 1000, 3),
+                    "hits": e["hits"],
+                }
+                for schema, e in entries
+            },
+        }
+
+structured_output_registry = StructuredOutputRegistry()
+
+def structured_output(model, schema, **kwargs):
+    """`model.with_structured_output(schema, **kwargs)`, built once and reused."""
+
+    return structured_output_registry.get(model, schema, **kwargs)
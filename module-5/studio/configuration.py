@@ -10,6 +10,7 @@ from dataclasses import dataclass
 class Configuration:
     """The configurable fields for the chatbot."""
     user_id: str = "default-user"
+    todo_view: str = "all" # "open" lists only open ToDo items and summarizes done / archived ones
 
     @classmethod
     def from_runnable_config(
@@ -1,5 +1,3 @@
-import uuid 
-
 from pydantic import BaseModel, Field
 
 from trustcall import create_extractor
@@ -11,6 +9,9 @@ from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.store.base import BaseStore
 import configuration
+from memory_search import all_memories, latest_user_text, search_memories
+from sqlite_store import store_from_env
+from store_batching import put_batch, trustcall_puts
 
 # Initialize the LLM
 model = ChatOpenAI(model="gpt-4o", temperature=0) 
@@ -53,9 +54,9 @@ def call_model(state: MessagesState, config: RunnableConfig, store: BaseStore):
     # Get the user ID from the config
     user_id = configurable.user_id
 
-    # Retrieve memory from the store
+    # Retrieve the memories most relevant to the latest message
     namespace = ("memories", user_id)
-    memories = store.search(namespace)
+    memories = search_memories(store, namespace, latest_user_text(state["messages"]))
 
     # Format the memories for the system prompt
     info = "\n".join(f"- {mem.value['content']}" for mem in memories)
@@ -79,8 +80,8 @@ def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore)
     # Define the namespace for the memories
     namespace = ("memories", user_id)
 
-    # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    # Retrieve every memory, so Trustcall can patch any of them instead of inserting a duplicate
+    existing_items = all_memories(store, namespace)
 
     # Format the existing memories for the Trustcall extractor
     tool_name = "Memory"
@@ -97,12 +98,8 @@ def write_memory(state: MessagesState, config: RunnableConfig, store: BaseStore)
     result = trustcall_extractor.invoke({"messages": updated_messages, 
                                         "existing": existing_memories})
 
-    # Save the memories from Trustcall to the store
-    for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(namespace,
-                  rmeta.get("json_doc_id", str(uuid.uuid4())),
-                  r.model_dump(mode="json"),
-            )
+    # Save the memories from Trustcall to the store in one batch
+    put_batch(store, trustcall_puts(namespace, result))
 
 # Define the graph
 builder = StateGraph(MessagesState,config_schema=configuration.Configuration)
@@ -111,4 +108,4 @@ builder.add_node("write_memory", write_memory)
 builder.add_edge(START, "call_model")
 builder.add_edge("call_model", "write_memory")
 builder.add_edge("write_memory", END)
-graph = builder.compile()
\ No newline at end of file
+graph = builder.compile(store=store_from_env())
\ No newline at end of file
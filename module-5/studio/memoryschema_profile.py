@@ -8,6 +8,7 @@ from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.store.base import BaseStore
 import configuration
+from sqlite_store import store_from_env
 
 # Initialize the LLM
 model = ChatOpenAI(model="gpt-4o", temperature=0) 
@@ -101,4 +102,4 @@ builder.add_node("write_memory", write_memory)
 builder.add_edge(START, "call_model")
 builder.add_edge("call_model", "write_memory")
 builder.add_edge("write_memory", END)
-graph = builder.compile()
\ No newline at end of file
+graph = builder.compile(store=store_from_env())
\ No newline at end of file
@@ -28,29 +28,16 @@ class MemoryCollection(BaseModel):
 
 from trustcall import create_extractor
 
-class Spy:
-    def __init__(self):
-        self.called_tools = []
+from tool_capture import ToolCallCapture
 
-    def __call__(self, run):
-        q = [run]
-        while q:
-            r = q.pop()
-            if r.child_runs:
-                q.extend(r.child_runs)
-            if r.run_type == "chat_model":
-                self.called_tools.append(
-                    r.outputs["generations"][0][0]["message"]["kwargs"]["tool_calls"]
-                )
-
-spy = Spy()
+capture = ToolCallCapture()
 
 trustcall_extractor = create_extractor(
     model,
     tools=[Memory],
     tool_choice="auto",
     enable_inserts=True,
-).with_listeners(on_end=spy)
+).with_config(callbacks=[capture])
 
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 
@@ -33,6 +33,8 @@ from langgraph.graph import StateGraph, MessagesState, END, START
 from langgraph.store.base import BaseStore
 from langgraph.store.memory import InMemoryStore
 
+from tool_capture import ToolCallCapture, with_capture
+
 
 #region model definitions
 
@@ -69,22 +71,6 @@ class ToDo(BaseModel):
 
 #endregion model definitions
 
-class Spy:
-    """Spy class to capture tool calls from model execution"""
-    def __init__(self):
-        self.called_tools = []
-
-    def __call__(self, run):
-        q = [run]
-        while q:
-            r = q.pop()
-            if r.child_runs:
-                q.extend(r.child_runs)
-            if r.run_type == "chat_model":
-                self.called_tools.append(
-                    r.outputs["generations"][0][0]["message"]["kwargs"]["tool_calls"]
-                )
-
 def extract_tool_info(called_tools, tool_name):
     """Extract tool call information and return a descriptive message"""
     if not called_tools:
@@ -118,6 +104,14 @@ profile_extractor = create_extractor(
     enable_inserts=True,
 )
 
+# Compiled once; each update passes its own ToolCallCapture as a callback
+todo_extractor = create_extractor(
+    model,
+    tools=[ToDo],
+    tool_choice="ToDo",
+    enable_inserts=True,
+)
+
 # Chatbot instruction for choosing what to update and what tools to call 
 MODEL_SYSTEM_MESSAGE = """You are a helpful chatbot. 
 
@@ -274,20 +268,12 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     TRUSTCALL_INSTRUCTION_FORMATTED=TRUSTCALL_INSTRUCTION.format(time=datetime.now().isoformat())
     updated_messages=list(merge_message_runs(messages=[SystemMessage(content=TRUSTCALL_INSTRUCTION_FORMATTED)] + state["messages"][:-1]))
 
-    # Initialize the spy for visibility into the tool calls made by Trustcall
-    spy = Spy()
+    # Capture the tool calls made by Trustcall for the ToolMessage below
+    capture = ToolCallCapture()
     
-    # Create the Trustcall extractor for updating the ToDo list 
-    todo_extractor = create_extractor(
-    model,
-    tools=[ToDo],
-    tool_choice=tool_name,
-    enable_inserts=True
-    ).with_listeners(on_end=spy)
-
-    # Invoke the extractor
-    result = todo_extractor.invoke({"messages": updated_messages, 
-                                    "existing": existing_memories})
+    # Invoke the extractor with the capture added to this run's callbacks
+    result = todo_extractor.invoke({"messages": updated_messages, "existing": existing_memories},
+                                   config=with_capture(config, capture))
 
     # Save the memories from Trustcall to the store
     for r, rmeta in zip(result["responses"], result["response_metadata"]):
@@ -300,7 +286,7 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     tool_calls = state['messages'][-1].tool_calls
 
     # Extract the changes made by Trustcall and add the the ToolMessage returned to task_mAIstro
-    todo_update_msg = extract_tool_info(spy.called_tools, tool_name)
+    todo_update_msg = extract_tool_info(capture.called_tools, tool_name)
     return {"messages": [{"role": "tool", "content": todo_update_msg, "tool_call_id":tool_calls[0]['id']}]}
 
 def update_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore):
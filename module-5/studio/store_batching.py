@@ -0,0 +1,64 @@
+"""Batched store writes for the Trustcall memory update nodes.
+
+The update nodes used to call `store.put` once per Trustcall response, which
+is one round trip (or one SQLite transaction) per memory. `put_batch` sends
+all of an extraction's writes in a single `store.batch` call instead, and
+`write_stats` counts how many writes each batch carried.
+
+    put_batch(store, trustcall_puts(namespace, result))
+"""
+
+import threading
+import uuid
+from typing import Iterable, List, Sequence, Tuple
+
+from langgraph.store.base import BaseStore, PutOp
+
+class WriteStats:
+    """Counts store write batches and the writes they carry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.max_batch = 0
+
+    def record(self, writes: int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.writes += writes
+            self.max_batch = max(self.max_batch, writes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "writes": self.writes,
+                "writes_per_batch": self.writes / self.batches if self.batches else 0.0,
+                "max_batch": self.max_batch,
+            }
+
+write_stats = WriteStats()
+
+def trustcall_puts(namespace: Tuple[str, ...], result: dict) -> List[PutOp]:
+    """One PutOp per Trustcall response, keyed by the patched document id or a new one."""
+
+    return [
+        PutOp(namespace, rmeta.get("json_doc_id", str(uuid.uuid4())), r.model_dump(mode="json"))
+        for r, rmeta in zip(result["responses"], result["response_metadata"])
+    ]
+
+def put_batch(store: BaseStore, ops: Sequence[PutOp]) -> None:
+    """Write `ops` in a single store round trip."""
+
+    if ops:
+        store.batch(list(ops))
+        write_stats.record(len(ops))
+
+async def aput_batch(store: BaseStore, ops: Iterable[PutOp]) -> None:
+    """Async version of `put_batch`."""
+
+    ops = list(ops)
+    if ops:
+        await store.abatch(ops)
+        write_stats.record(len(ops))
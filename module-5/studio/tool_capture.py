@@ -0,0 +1,61 @@
+"""Tool-call capture for the Trustcall extractors.
+
+The update nodes used to attach a `Spy` with `with_listeners(on_end=spy)`,
+which makes LangChain keep the whole run tree of the extraction and then walks
+it after the fact, digging each chat model's tool calls out of its serialized
+outputs. `ToolCallCapture` is a callback handler instead: it is called as each
+chat model finishes and keeps only the compact tool-call records, so the run
+tree is never built or retained.
+
+    capture = ToolCallCapture()
+    result = todo_extractor.invoke(inputs, config=with_capture(config, capture))
+    extract_tool_info(capture.called_tools, "ToDo")
+
+Inside a node, pass the node's `config` through `with_capture`: it adds the
+capture to the run's callbacks, so the extraction stays part of the graph run
+(tracing, stream_mode="messages", the caller's handlers). A bare
+`config={"callbacks": [capture]}`, or `.with_config(callbacks=[capture])`,
+replaces the inherited callbacks instead.
+
+`called_tools` holds one list of {"name", "args", "id"} records per chat model
+call, in the order the calls finished.
+"""
+
+import threading
+from typing import Any, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
+
+class ToolCallCapture(BaseCallbackHandler):
+    """Callback handler that records the tool calls of every chat model call."""
+
+    # Record synchronously, also under the async callback manager, so the calls
+    # are complete by the time invoke/ainvoke returns
+    run_inline = True
+
+    def __init__(self):
+        self.called_tools: List[List[dict]] = []
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        if message is None:
+            return
+        calls = [{"name": call["name"], "args": call["args"], "id": call["id"]}
+                 for call in getattr(message, "tool_calls", ())]
+        # Trustcall patches several documents in parallel
+        with self._lock:
+            self.called_tools.append(calls)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.called_tools = []
+
+def with_capture(config: RunnableConfig, capture: ToolCallCapture) -> RunnableConfig:
+    """`config` with `capture` added to its callbacks."""
+
+    return merge_configs(config, {"callbacks": [capture]})
@@ -12,6 +12,7 @@ class Configuration:
     user_id: str = "default-user"
     todo_category: str = "general" 
     task_maistro_role: str = "You are a helpful task management assistant. You help you create, organize, and manage the user's ToDo list."
+    todo_view: str = "all" # "open" lists only open ToDo items and summarizes done / archived ones
 
     @classmethod
     def from_runnable_config(
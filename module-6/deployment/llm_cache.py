@@ -0,0 +1,252 @@
+"""Content-addressed response cache for the chat models used by the graphs.
+
+The cache plugs into LangChain's standard `cache=` hook on chat models, so every
+`invoke` / `with_structured_output` / `bind_tools` call made through a cached
+model is looked up before it reaches the provider.
+
+Entries are keyed on a hash of the model configuration (model name, sampling
+parameters, bound tools) and the normalized prompt messages. Message ids and
+provider metadata are dropped before hashing, so a replay of the same
+conversation hits the cache even though LangGraph assigned fresh message ids.
+
+Two tiers:
+- an in-memory LRU (always on)
+- an optional on-disk SQLite tier with a TTL and a size cap, shared across
+  processes and restarts
+
+Configure from the environment with `TieredLLMCache.from_env()`. Caching is
+opt-in: a cached model returns the same response for a repeated prompt, also
+at temperature > 0, so graphs only use it when asked to:
+- LLM_CACHE=on enables caching (off by default)
+- LLM_CACHE_MAX_ITEMS sets the LRU size (default 1024)
+- LLM_CACHE_PATH enables the SQLite tier at that path
+- LLM_CACHE_TTL_SECONDS sets the SQLite TTL (default 7 days)
+- LLM_CACHE_MAX_BYTES caps the SQLite tier size (default 256 MiB)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+# Message fields that do not change what the model sees
+_VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+def normalize_prompt(prompt: str) -> str:
+    """Return a canonical form of a serialized prompt for hashing."""
+
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+
+    def strip(node: Any) -> Any:
+        if isinstance(node, dict):
+            return {
+                key: strip(value)
+                for key, value in node.items()
+                if not (key in _VOLATILE_FIELDS and node.get("type") != "constructor")
+            }
+        if isinstance(node, list):
+            return [strip(value) for value in node]
+        return node
+
+    return json.dumps(strip(messages), sort_keys=True, ensure_ascii=False)
+
+def serialize_generations(return_val: RETURN_VAL_TYPE) -> str:
+    """Serialize chat / text generations to JSON for the disk tier."""
+
+    return json.dumps([
+        {"message": message_to_dict(generation.message), "generation_info": generation.generation_info}
+        if isinstance(generation, ChatGeneration)
+        else {"text": generation.text, "generation_info": generation.generation_info}
+        for generation in return_val
+    ])
+
+def deserialize_generations(value: str) -> RETURN_VAL_TYPE:
+    generations = []
+    for item in json.loads(value):
+        if "message" in item:
+            message = messages_from_dict([item["message"]])[0]
+            generations.append(ChatGeneration(message=message, generation_info=item["generation_info"]))
+        else:
+            generations.append(Generation(text=item["text"], generation_info=item["generation_info"]))
+    return generations
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Content address of a (model configuration, prompt) pair."""
+
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(normalize_prompt(prompt).encode("utf-8"))
+    return digest.hexdigest()
+
+class SQLiteCacheTier:
+    """On-disk cache tier with TTL and size-based (least recently used) eviction."""
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 max_bytes: Optional[int] = 256 * 2**20):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return deserialize_generations(value)
+
+    def put(self, key: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = serialize_generations(return_val)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            cursor = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            self.evictions += cursor.rowcount
+        if self.max_bytes is None:
+            return
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until the tier fits again
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+class TieredLLMCache(BaseCache):
+    """LangChain cache with an in-memory LRU in front of an optional SQLite tier."""
+
+    def __init__(self, max_items: int = 1024, disk: Optional[SQLiteCacheTier] = None):
+        self.max_items = max_items
+        self.disk = disk
+        self._memory: "OrderedDict[str, RETURN_VAL_TYPE]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["TieredLLMCache"]:
+        """Build the cache configured by the LLM_CACHE_* environment variables."""
+
+        if os.environ.get("LLM_CACHE", "off").lower() not in ("1", "on", "true", "yes"):
+            return None
+        disk = None
+        path = os.environ.get("LLM_CACHE_PATH")
+        if path:
+            disk = SQLiteCacheTier(
+                path,
+                ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+                max_bytes=int(os.environ.get("LLM_CACHE_MAX_BYTES", 256 * 2**20)),
+            )
+        return cls(max_items=int(os.environ.get("LLM_CACHE_MAX_ITEMS", 1024)), disk=disk)
+
+    def _remember(self, key: str, return_val: RETURN_VAL_TYPE) -> None:
+        with self._lock:
+            self._memory[key] = return_val
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+        if self.disk is not None:
+            return_val = self.disk.get(key)
+            if return_val is not None:
+                self.disk_hits += 1
+                self._remember(key, return_val)
+                return return_val
+        self.misses += 1
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        self._remember(key, return_val)
+        if self.disk is not None:
+            self.disk.put(key, return_val)
+        self.writes += 1
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        """Hit / miss counters, e.g. for logging at the end of a run."""
+
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_evictions": self.disk.evictions if self.disk is not None else 0,
+        }
+
+# Shared by every model built in this studio directory
+llm_cache = TieredLLMCache.from_env()
@@ -0,0 +1,116 @@
+"""Single-pass, per-run cached memory reads for task_mAIstro.
+
+`task_mAIstro` used to make three `store.search` calls (profile, ToDo list,
+instructions) before every model call, including each time the graph looped
+back from an update node. `load_memories` instead:
+
+- sends all the namespace reads of one call as a single `store.batch`
+- caches the results for the rest of the run, so the update nodes and later
+  passes through task_mAIstro read from memory
+- is invalidated per namespace by the update nodes after they write, through
+  `invalidate_memories`
+
+A run is identified by config["configurable"]["run_id"] (set by LangGraph
+Platform) or else by the thread and the id of the latest human message, which
+stays the same for every node of one conversation turn. Calls without either
+are not cached.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from langchain_core.messages import AnyMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.store.base import BaseStore, Item
+
+from memory_search import memory_search_op, rank_memories
+
+# Number of runs whose memories are kept
+MAX_RUNS = 256
+
+class MemoryRequest(NamedTuple):
+    namespace: Tuple[str, ...]
+    query: Optional[str] = None # Rank by relevance to this text (see memory_search)
+    limit: Optional[int] = None # Defaults to MEMORY_SEARCH_LIMIT; ALL_MEMORIES reads the whole namespace
+
+def run_key(config: Optional[RunnableConfig], messages: Sequence[AnyMessage] = ()) -> Optional[str]:
+    configurable = (config or {}).get("configurable", {})
+    if configurable.get("run_id"):
+        return str(configurable["run_id"])
+    turn = next((m.id for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+    if configurable.get("thread_id") and turn:
+        return f"{configurable['thread_id']}:{turn}"
+    return None
+
+class MemoryCache:
+    """Read-through cache of memory searches, one entry set per run."""
+
+    def __init__(self, max_runs: int = MAX_RUNS):
+        self.max_runs = max_runs
+        self._runs: "OrderedDict[str, Dict[MemoryRequest, List[Item]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.round_trips = 0
+
+    def load(self, store: BaseStore, requests: Dict[str, MemoryRequest], config: Optional[RunnableConfig] = None,
+             messages: Sequence[AnyMessage] = ()) -> Dict[str, List[Item]]:
+        key = run_key(config, messages)
+        results: Dict[str, List[Item]] = {}
+        pending = []
+        with self._lock:
+            cached = self._runs.get(key, {}) if key else {}
+            for name, request in requests.items():
+                request = MemoryRequest(tuple(request.namespace), request.query, request.limit)
+                if request in cached:
+                    results[name] = cached[request]
+                    self.hits += 1
+                else:
+                    pending.append((name, request))
+
+        if pending:
+            # Every namespace that missed is read in the same round trip
+            ops = [memory_search_op(store, r.namespace, r.query, r.limit) for _, r in pending]
+            for (name, request), op, items in zip(pending, ops, store.batch(ops)):
+                results[name] = rank_memories(store, op, items, request.query, request.limit)
+            with self._lock:
+                self.misses += len(pending)
+                self.round_trips += 1
+                if key:
+                    run = self._runs.setdefault(key, {})
+                    for name, request in pending:
+                        run[request] = results[name]
+                    self._runs.move_to_end(key)
+                    while len(self._runs) > self.max_runs:
+                        self._runs.popitem(last=False)
+        return results
+
+    def invalidate(self, config: Optional[RunnableConfig], namespace: Tuple[str, ...],
+                   messages: Sequence[AnyMessage] = ()) -> None:
+        """Drop the run's cached reads of `namespace`, after it was written."""
+
+        key = run_key(config, messages)
+        if not key:
+            return
+        with self._lock:
+            run = self._runs.get(key)
+            if run:
+                for request in [r for r in run if r.namespace == tuple(namespace)]:
+                    del run[request]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"runs": len(self._runs), "hits": self.hits, "misses": self.misses, "round_trips": self.round_trips}
+
+memory_cache = MemoryCache()
+
+def load_memories(store: BaseStore, requests: Dict[str, MemoryRequest], config: Optional[RunnableConfig] = None,
+                  messages: Sequence[AnyMessage] = ()) -> Dict[str, List[Item]]:
+    """Read several memory namespaces in one round trip, cached for the run."""
+
+    return memory_cache.load(store, requests, config, messages)
+
+def invalidate_memories(config: Optional[RunnableConfig], namespace: Tuple[str, ...],
+                        messages: Sequence[AnyMessage] = ()) -> None:
+    memory_cache.invalidate(config, namespace, messages)
@@ -0,0 +1,270 @@
+"""Query-aware retrieval of long-term memories.
+
+The chatbots used to put every memory of a namespace into the system prompt,
+so prompts grew with the user's memory collection or ToDo list. Nodes now ask
+for the `limit` memories most relevant to the latest user message:
+
+- stores created with a vector index (`InMemoryStore(index=memory_index_config())`,
+  or the `store.index` section of langgraph.json) answer `store.search(namespace,
+  query=...)` themselves
+- stores without an index (`SQLiteStore`, or any store whose query search
+  returns unscored items) fall back to reading the whole namespace and ranking
+  it here, with embeddings cached per item version so each memory is embedded
+  once; the first fallback per store is logged as a warning and every search
+  is counted in `search_stats`. That fallback reads and scores the whole
+  namespace on every query, so it is O(n) in the namespace size; only the
+  embeddings are reused between queries
+
+Relevance ranking only decides what goes into a prompt. Trustcall extractors
+can only patch the items they are shown (and would insert duplicates of the
+rest), so update nodes read the whole namespace with `limit=ALL_MEMORIES`.
+
+Whether a store has an index is read from its `index_config` when it exposes
+one. Otherwise the first query search asks the store itself (with a full page
+limit, so the fallback needs no second read) and the answer is remembered:
+items with a `score` mean the store ranked them.
+
+`HashingEmbeddings` is a local stand-in for a hosted embedding model: hashed
+word and word-pair features, L2 normalised. It needs no network or API key and
+is deterministic, so it also works for tests and benchmarks. Swap in a real
+model by pointing the store's index config at it.
+
+Environment:
+- MEMORY_SEARCH_LIMIT: memories per namespace put in a prompt (default 10)
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AnyMessage, HumanMessage
+from langgraph.store.base import BaseStore, Item, SearchOp
+
+DEFAULT_MEMORY_SEARCH_LIMIT = int(os.environ.get("MEMORY_SEARCH_LIMIT", 10))
+EMBEDDING_DIMS = 1024
+
+# Items read per page when reading a whole namespace
+SCAN_PAGE_SIZE = 10_000
+
+# `limit` that reads every item of a namespace, in store order and unranked
+ALL_MEMORIES = 0
+
+# Number of item embeddings kept for stores without a vector index
+MAX_CACHED_VECTORS = 100_000
+
+_WORD = re.compile(r"\w+")
+
+logger = logging.getLogger(__name__)
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic local embeddings from hashed word and word-pair features."""
+
+    def __init__(self, dims: int = EMBEDDING_DIMS):
+        self.dims = dims
+
+    def embed_sparse(self, text: str) -> Dict[int, float]:
+        """Non-zero dimensions of the embedding of `text`."""
+
+        words = [word.lower() for word in _WORD.findall(text)]
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector: Dict[int, float] = {}
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dims
+            vector[bucket] = vector.get(bucket, 0.0) + (1.0 if digest[4] & 1 else -1.0)
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {i: v / norm for i, v in vector.items() if v}
+
+    def _embed(self, text: str) -> List[float]:
+        dense = [0.0] * self.dims
+        for i, v in self.embed_sparse(text).items():
+            dense[i] = v
+        return dense
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+local_embeddings = HashingEmbeddings()
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embedding function for the `store.index.embed` entry of langgraph.json."""
+
+    return local_embeddings.embed_documents(texts)
+
+def memory_index_config() -> dict:
+    """Index config for `InMemoryStore(index=...)` using the local embeddings."""
+
+    return {"embed": local_embeddings, "dims": EMBEDDING_DIMS}
+
+def latest_user_text(messages: Sequence[AnyMessage]) -> str:
+    """Content of the most recent user message, used as the memory search query."""
+
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage) and isinstance(message.content, str):
+            return message.content
+    return ""
+
+def item_text(value: Any) -> str:
+    """Flatten a memory value into the text that is embedded."""
+
+    if isinstance(value, dict):
+        return "\n".join(item_text(v) for v in value.values() if v not in (None, "", []))
+    if isinstance(value, list):
+        return "\n".join(item_text(v) for v in value)
+    return str(value)
+
+class VectorCache:
+    """Sparse embeddings of store items keyed by (namespace, key, updated_at).
+
+    Hashed features touch few dimensions, so vectors are kept sparse and dot
+    products only visit their non-zero entries.
+    """
+
+    def __init__(self, embeddings: HashingEmbeddings, max_items: int = MAX_CACHED_VECTORS):
+        self.embeddings = embeddings
+        self.max_items = max_items
+        self._vectors: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def vectors(self, items: List[Item]) -> List[Dict[int, float]]:
+        keys = [(tuple(item.namespace), item.key) for item in items]
+        versions = [str(item.updated_at) for item in items]
+        result, missing = [None] * len(items), []
+        with self._lock:
+            for i, (key, version) in enumerate(zip(keys, versions)):
+                cached = self._vectors.get(key)
+                if cached is not None and cached[0] == version:
+                    self._vectors.move_to_end(key)
+                    result[i] = cached[1]
+                else:
+                    missing.append(i)
+        if missing:
+            embedded = [self.embeddings.embed_sparse(item_text(items[i].value)) for i in missing]
+            with self._lock:
+                for i, vector in zip(missing, embedded):
+                    result[i] = vector
+                    self._vectors[keys[i]] = (versions[i], vector)
+                while len(self._vectors) > self.max_items:
+                    self._vectors.popitem(last=False)
+        return result
+
+vector_cache = VectorCache(local_embeddings)
+
+def _all_items(store: BaseStore, namespace: tuple, offset: int = 0) -> List[Item]:
+    items = []
+    while True:
+        page = store.search(namespace, limit=SCAN_PAGE_SIZE, offset=offset)
+        items.extend(page)
+        if len(page) < SCAN_PAGE_SIZE:
+            return items
+        offset += SCAN_PAGE_SIZE
+
+class SearchStats:
+    """Counts of query searches ranked by the store vs. ranked here."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.store_ranked = 0
+        self.locally_ranked = 0
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"store_ranked": self.store_ranked, "locally_ranked": self.locally_ranked}
+
+search_stats = SearchStats()
+
+# Stores known to have (True) or lack (False) a vector index
+_store_indexed: "weakref.WeakKeyDictionary[BaseStore, bool]" = weakref.WeakKeyDictionary()
+
+def store_indexed(store: BaseStore) -> Optional[bool]:
+    """Whether `store` ranks query searches itself; None until it is known."""
+
+    if getattr(store, "index_config", None):
+        return True
+    return _store_indexed.get(store)
+
+def _learn_index(store: BaseStore, items: List[Item]) -> Optional[bool]:
+    if not items:
+        return None
+    indexed = any(getattr(item, "score", None) is not None for item in items)
+    if not indexed and store not in _store_indexed:
+        logger.warning("%s has no vector index: memories are ranked with local embeddings "
+                       "over a full read of each namespace", type(store).__name__)
+    _store_indexed[store] = indexed
+    return indexed
+
+def all_memories(store: BaseStore, namespace: tuple) -> List[Item]:
+    """Every item of `namespace`, in store order."""
+
+    return _all_items(store, namespace)
+
+def memory_search_op(store: BaseStore, namespace: tuple, query: str,
+                     limit: Optional[int] = None) -> SearchOp:
+    """Store operation fetching the candidates of `search_memories`, for use in a batch."""
+
+    if limit == ALL_MEMORIES:
+        return SearchOp(namespace, limit=SCAN_PAGE_SIZE)
+    limit = limit or DEFAULT_MEMORY_SEARCH_LIMIT
+    if not query:
+        return SearchOp(namespace, limit=limit)
+    indexed = store_indexed(store)
+    if indexed:
+        return SearchOp(namespace, query=query, limit=limit)
+    if indexed is None:
+        # Unknown: let the store rank a full page, which also serves the fallback
+        return SearchOp(namespace, query=query, limit=SCAN_PAGE_SIZE)
+    # Ranked here, so read the whole namespace
+    return SearchOp(namespace, limit=SCAN_PAGE_SIZE)
+
+def rank_memories(store: BaseStore, op: SearchOp, items: List[Item], query: str,
+                  limit: Optional[int] = None) -> List[Item]:
+    """The `limit` most relevant of the `items` returned for `op`."""
+
+    if limit == ALL_MEMORIES:
+        if len(items) == SCAN_PAGE_SIZE:
+            items = items + _all_items(store, op.namespace_prefix, SCAN_PAGE_SIZE)
+        return items
+    limit = limit or DEFAULT_MEMORY_SEARCH_LIMIT
+    if not query:
+        return items
+    indexed = store_indexed(store)
+    if indexed is None:
+        indexed = _learn_index(store, items)
+    if indexed:
+        search_stats.count("store_ranked")
+        return items[:limit]
+
+    # No vector index on this store: rank its items with the local embeddings
+    search_stats.count("locally_ranked")
+    if len(items) == SCAN_PAGE_SIZE:
+        items = items + _all_items(store, op.namespace_prefix, SCAN_PAGE_SIZE)
+    if len(items) <= limit:
+        return items
+    query_vector = local_embeddings.embed_sparse(query)
+    scores = [
+        sum(value * query_vector.get(i, 0.0) for i, value in vector.items())
+        for vector in vector_cache.vectors(items)
+    ]
+    ranked = sorted(range(len(items)), key=lambda i: -scores[i])[:limit]
+    return [items[i] for i in ranked]
+
+def search_memories(store: BaseStore, namespace: tuple, query: str,
+                    limit: Optional[int] = None) -> List[Item]:
+    """The `limit` memories in `namespace` most relevant to `query`."""
+
+    op = memory_search_op(store, namespace, query, limit)
+    return rank_memories(store, op, store.batch([op])[0], query, limit)
@@ -0,0 +1,299 @@
+"""Durable SQLite implementation of LangGraph's `BaseStore`.
+
+`InMemoryStore` keeps every profile, ToDo and instruction memory in RAM and
+loses them on restart. `SQLiteStore` keeps them in one SQLite file in WAL
+mode, so readers never block the writer and a restart picks up where the last
+run left off. It follows `InMemoryStore` semantics: search returns a
+namespace's items in insertion order (updates keep their position), reads in
+a batch see the state before the batch's writes, the last write to a key in a
+batch wins, and `query` is ignored because there is no vector index. Across
+namespaces, results are grouped by namespace in sorted order.
+
+Without an index, `memory_search` ranks query searches itself over a full
+read of the namespace: O(n) per query in the number of items, with each
+item's embedding cached per version.
+
+Layout:
+
+- one row per item; the namespace is stored as its labels joined with \\x1f
+- UNIQUE (prefix, key) serves `get` and upserts
+- an index on (prefix), which also covers rowid, serves `search` for a
+  namespace and its children as one range scan in insertion order:
+  'a\\x1fb' <= prefix < 'a\\x1fb\\x20'
+- all writes of one `batch` call commit in a single transaction
+
+Usage:
+
+    store = SQLiteStore.from_path("./state_db/memory_store.db")
+    graph = builder.compile(store=store)
+
+Graphs compile with `store_from_env()`, which opens the store at
+MEMORY_STORE_PATH when it is set and otherwise leaves the store to LangGraph
+Platform / `langgraph dev`.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langgraph.store.base import (
+    BaseStore,
+    GetOp,
+    Item,
+    ListNamespacesOp,
+    MatchCondition,
+    Op,
+    PutOp,
+    Result,
+    SearchItem,
+    SearchOp,
+)
+
+SEPARATOR = "\x1f"
+# The character right after SEPARATOR bounds a namespace's children
+SEPARATOR_END = chr(ord(SEPARATOR) + 1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS store (
+    prefix TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE (prefix, key)
+);
+CREATE INDEX IF NOT EXISTS store_prefix ON store (prefix);
+"""
+
+def _encode_namespace(namespace: Tuple[str, ...]) -> str:
+    return SEPARATOR.join(namespace)
+
+def _decode_namespace(prefix: str) -> Tuple[str, ...]:
+    return tuple(prefix.split(SEPARATOR)) if prefix else ()
+
+# A namespace and its children: one index range scan from the namespace up to
+# the first label after it, minus labels that merely start with the same text
+_PREFIX_RANGE = " WHERE prefix >= ? AND prefix < ? AND (prefix = ? OR substr(prefix, ?, 1) = ?)"
+
+def _prefix_range_params(namespace: Tuple[str, ...]) -> list:
+    prefix = _encode_namespace(namespace)
+    return [prefix, prefix + SEPARATOR_END, prefix, len(prefix) + 1, SEPARATOR]
+
+def _compare_values(item_value: Any, filter_value: Any) -> bool:
+    """Filter comparison with the same rules as InMemoryStore."""
+
+    if isinstance(filter_value, dict):
+        if any(k.startswith("$") for k in filter_value):
+            return all(_apply_operator(item_value, op, value) for op, value in filter_value.items())
+        if not isinstance(item_value, dict):
+            return False
+        return all(_compare_values(item_value.get(k), v) for k, v in filter_value.items())
+    if isinstance(filter_value, (list, tuple)):
+        return (isinstance(item_value, (list, tuple)) and len(item_value) == len(filter_value)
+                and all(_compare_values(i, f) for i, f in zip(item_value, filter_value)))
+    return item_value == filter_value
+
+def _apply_operator(value: Any, operator: str, operand: Any) -> bool:
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$gt":
+        return float(value) > float(operand)
+    if operator == "$gte":
+        return float(value) >= float(operand)
+    if operator == "$lt":
+        return float(value) < float(operand)
+    if operator == "$lte":
+        return float(value) <= float(operand)
+    raise ValueError(f"Unsupported operator: {operator}")
+
+def _matches(condition: MatchCondition, namespace: Tuple[str, ...]) -> bool:
+    path = tuple(condition.path)
+    if len(namespace) < len(path):
+        return False
+    labels = namespace[:len(path)] if condition.match_type == "prefix" else namespace[len(namespace) - len(path):]
+    return all(p == "*" or p == label for p, label in zip(path, labels))
+
+class SQLiteStore(BaseStore):
+    """`BaseStore` on a single SQLite database in WAL mode."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._lock = threading.Lock()
+        self.write_batches = 0
+        self.writes = 0
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+
+    @classmethod
+    def from_path(cls, path: str) -> "SQLiteStore":
+        # One connection shared by all threads; access is serialized by the lock
+        return cls(sqlite3.connect(path, check_same_thread=False, isolation_level=None))
+
+    ## BaseStore
+
+    def batch(self, ops: Iterable[Op]) -> List[Result]:
+        ops = list(ops)
+        results: List[Result] = [None] * len(ops)
+        puts: Dict[Tuple[Tuple[str, ...], str], PutOp] = {}
+        with self._lock:
+            # Reads see the store as it was before this batch's writes
+            for i, op in enumerate(ops):
+                if isinstance(op, GetOp):
+                    results[i] = self._get(op)
+                elif isinstance(op, SearchOp):
+                    results[i] = self._search(op)
+                elif isinstance(op, ListNamespacesOp):
+                    results[i] = self._list_namespaces(op)
+                elif isinstance(op, PutOp):
+                    # Last write to a key wins
+                    puts[(op.namespace, op.key)] = op
+                else:
+                    raise ValueError(f"Unknown operation type: {type(op)}")
+            if puts:
+                self._apply_puts(puts.values())
+        return results
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Result]:
+        return await asyncio.to_thread(self.batch, list(ops))
+
+    ## Operations
+
+    def _get(self, op: GetOp) -> Optional[Item]:
+        row = self.conn.execute(
+            "SELECT prefix, key, value, created_at, updated_at FROM store WHERE prefix = ? AND key = ?",
+            (_encode_namespace(op.namespace), op.key),
+        ).fetchone()
+        return self._item(row, Item) if row else None
+
+    def _search(self, op: SearchOp) -> List[SearchItem]:
+        sql = "SELECT prefix, key, value, created_at, updated_at FROM store"
+        params: List[Any] = []
+        if op.namespace_prefix:
+            sql += _PREFIX_RANGE
+            params += _prefix_range_params(op.namespace_prefix)
+        sql += " ORDER BY prefix, rowid"
+
+        if not op.filter:
+            rows = self.conn.execute(sql + " LIMIT ? OFFSET ?", params + [op.limit, op.offset]).fetchall()
+            return [self._item(row, SearchItem) for row in rows]
+
+        # Filters are applied in Python, reading only until the page is full
+        items, skipped = [], 0
+        for row in self.conn.execute(sql, params):
+            value = json.loads(row[2])
+            if not all(_compare_values(value.get(k), v) for k, v in op.filter.items()):
+                continue
+            if skipped < op.offset:
+                skipped += 1
+                continue
+            items.append(self._item(row, SearchItem, value))
+            if len(items) >= op.limit:
+                break
+        return items
+
+    def _list_namespaces(self, op: ListNamespacesOp) -> List[Tuple[str, ...]]:
+        sql, params = "SELECT DISTINCT prefix FROM store", []
+        conditions = list(op.match_conditions or ())
+        # A leading literal prefix condition narrows the scan to its range
+        for condition in conditions:
+            literal = []
+            for label in condition.path:
+                if label == "*":
+                    break
+                literal.append(label)
+            if condition.match_type == "prefix" and literal:
+                sql += _PREFIX_RANGE
+                params += _prefix_range_params(tuple(literal))
+                if len(literal) == len(condition.path):
+                    conditions.remove(condition)
+                break
+
+        # Joined prefixes sort like the namespace tuples, so with nothing left
+        # to filter or truncate the index can page through them directly
+        if not conditions and op.max_depth is None:
+            rows = self.conn.execute(sql + " ORDER BY prefix LIMIT ? OFFSET ?", params + [op.limit, op.offset])
+            return [_decode_namespace(row[0]) for row in rows]
+
+        namespaces = [_decode_namespace(row[0]) for row in self.conn.execute(sql, params)]
+        if conditions:
+            namespaces = [ns for ns in namespaces if all(_matches(c, ns) for c in conditions)]
+        if op.max_depth is not None:
+            namespaces = sorted({ns[:op.max_depth] for ns in namespaces})
+        else:
+            namespaces = sorted(namespaces)
+        return namespaces[op.offset:op.offset + op.limit]
+
+    def _apply_puts(self, puts: Iterable[PutOp]) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        upserts, deletes = [], []
+        for op in puts:
+            prefix = _encode_namespace(op.namespace)
+            if op.value is None:
+                deletes.append((prefix, op.key))
+            else:
+                upserts.append((prefix, op.key, json.dumps(op.value), now, now))
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if deletes:
+                self.conn.executemany("DELETE FROM store WHERE prefix = ? AND key = ?", deletes)
+            if upserts:
+                # Upserting (rather than replacing) keeps the rowid, and with it
+                # the item's position in search results
+                self.conn.executemany(
+                    """INSERT INTO store (prefix, key, value, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT (prefix, key) DO UPDATE SET
+                           value = excluded.value,
+                           created_at = excluded.created_at,
+                           updated_at = excluded.updated_at""",
+                    upserts,
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.write_batches += 1
+        self.writes += len(upserts) + len(deletes)
+
+    @staticmethod
+    def _item(row: tuple, cls, value: Optional[dict] = None):
+        prefix, key, raw, created_at, updated_at = row
+        return cls(
+            namespace=_decode_namespace(prefix),
+            key=key,
+            value=value if value is not None else json.loads(raw),
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            items = self.conn.execute("SELECT COUNT(*) FROM store").fetchone()[0]
+        return {"items": items, "write_batches": self.write_batches, "writes": self.writes}
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+_stores: Dict[str, SQLiteStore] = {}
+_stores_lock = threading.Lock()
+
+def store_from_env() -> Optional[SQLiteStore]:
+    """The store at MEMORY_STORE_PATH, shared by every graph in the process, or None."""
+
+    path = os.environ.get("MEMORY_STORE_PATH")
+    if not path:
+        return None
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SQLiteStore.from_path(path)
+        return _stores[path]
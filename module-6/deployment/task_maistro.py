@@ -1,4 +1,3 @@
-import uuid
 from datetime import datetime
 
 from pydantic import BaseModel, Field
@@ -16,28 +15,18 @@ from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.store.base import BaseStore
-from langgraph.store.memory import InMemoryStore
 
 import configuration
+from llm_cache import llm_cache
+from memory_loader import MemoryRequest, invalidate_memories, load_memories
+from memory_search import ALL_MEMORIES
+from sqlite_store import store_from_env
+from store_batching import put_batch, trustcall_puts
+from todo_render import render_todos
+from tool_capture import ToolCallCapture, with_capture
 
 ## Utilities 
 
-# Inspect the tool calls for Trustcall
-class Spy:
-    def __init__(self):
-        self.called_tools = []
-
-    def __call__(self, run):
-        q = [run]
-        while q:
-            r = q.pop()
-            if r.child_runs:
-                q.extend(r.child_runs)
-            if r.run_type == "chat_model":
-                self.called_tools.append(
-                    r.outputs["generations"][0][0]["message"]["kwargs"]["tool_calls"]
-                )
-
 # Extract information from tool calls for both patches and new memories in Trustcall
 def extract_tool_info(tool_calls, schema_name="Memory"):
     """Extract information from tool calls for both patches and new memories.
@@ -138,7 +127,7 @@ class UpdateMemory(TypedDict):
     update_type: Literal['user', 'todo', 'instructions']
 
 # Initialize the model
-model = ChatOpenAI(model="gpt-4o", temperature=0)
+model = ChatOpenAI(model="gpt-4o", temperature=0, cache=llm_cache)
 
 ## Create the Trustcall extractors for updating the user profile and ToDo list
 profile_extractor = create_extractor(
@@ -147,6 +136,14 @@ profile_extractor = create_extractor(
     tool_choice="Profile",
 )
 
+# Compiled once; each update passes its own ToolCallCapture as a callback
+todo_extractor = create_extractor(
+    model,
+    tools=[ToDo],
+    tool_choice="ToDo",
+    enable_inserts=True,
+)
+
 ## Prompts 
 
 # Chatbot instruction for choosing what to update and what tools to call 
@@ -222,26 +219,17 @@ def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore)
     todo_category = configurable.todo_category
     task_maistro_role = configurable.task_maistro_role
 
-   # Retrieve profile memory from the store
-    namespace = ("profile", todo_category, user_id)
-    memories = store.search(namespace)
-    if memories:
-        user_profile = memories[0].value
-    else:
-        user_profile = None
-
-    # Retrieve people memory from the store
-    namespace = ("todo", todo_category, user_id)
-    memories = store.search(namespace)
-    todo = "\n".join(f"{mem.value}" for mem in memories)
-
-    # Retrieve custom instructions
-    namespace = ("instructions", todo_category, user_id)
-    memories = store.search(namespace)
-    if memories:
-        instructions = memories[0].value
-    else:
-        instructions = ""
+    # Retrieve the profile, the whole ToDo list (rendered in a stable order, see
+    # todo_render) and the custom instructions in one store round trip, cached
+    # for the rest of the run
+    memories = load_memories(store, {
+        "profile": MemoryRequest(("profile", todo_category, user_id), limit=ALL_MEMORIES),
+        "todo": MemoryRequest(("todo", todo_category, user_id), limit=ALL_MEMORIES),
+        "instructions": MemoryRequest(("instructions", todo_category, user_id)),
+    }, config, state["messages"])
+    user_profile = memories["profile"][0].value if memories["profile"] else None
+    todo = render_todos(memories["todo"], configurable.todo_view)
+    instructions = memories["instructions"][0].value if memories["instructions"] else ""
     
     system_msg = MODEL_SYSTEM_MESSAGE.format(task_maistro_role=task_maistro_role, user_profile=user_profile, todo=todo, instructions=instructions)
 
@@ -262,8 +250,8 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
     # Define the namespace for the memories
     namespace = ("profile", todo_category, user_id)
 
-    # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    # Retrieve every profile memory, so Trustcall can patch any of them (usually cached by task_mAIstro)
+    existing_items = load_memories(store, {"profile": MemoryRequest(namespace, limit=ALL_MEMORIES)}, config, state["messages"])["profile"]
 
     # Format the existing memories for the Trustcall extractor
     tool_name = "Profile"
@@ -281,12 +269,9 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
     result = profile_extractor.invoke({"messages": updated_messages, 
                                          "existing": existing_memories})
 
-    # Save save the memories from Trustcall to the store
-    for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(namespace,
-                  rmeta.get("json_doc_id", str(uuid.uuid4())),
-                  r.model_dump(mode="json"),
-            )
+    # Save the memories from Trustcall to the store in one batch
+    put_batch(store, trustcall_puts(namespace, result))
+    invalidate_memories(config, namespace, state["messages"])
     tool_calls = state['messages'][-1].tool_calls
     # Return tool message with update verification
     return {"messages": [{"role": "tool", "content": "updated profile", "tool_call_id":tool_calls[0]['id']}]}
@@ -303,8 +288,8 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     # Define the namespace for the memories
     namespace = ("todo", todo_category, user_id)
 
-    # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    # Retrieve the whole ToDo list, so Trustcall can patch any item instead of inserting a duplicate
+    existing_items = load_memories(store, {"todo": MemoryRequest(namespace, limit=ALL_MEMORIES)}, config, state["messages"])["todo"]
 
     # Format the existing memories for the Trustcall extractor
     tool_name = "ToDo"
@@ -318,33 +303,22 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     TRUSTCALL_INSTRUCTION_FORMATTED=TRUSTCALL_INSTRUCTION.format(time=datetime.now().isoformat())
     updated_messages=list(merge_message_runs(messages=[SystemMessage(content=TRUSTCALL_INSTRUCTION_FORMATTED)] + state["messages"][:-1]))
 
-    # Initialize the spy for visibility into the tool calls made by Trustcall
-    spy = Spy()
+    # Capture the tool calls made by Trustcall for the ToolMessage below
+    capture = ToolCallCapture()
     
-    # Create the Trustcall extractor for updating the ToDo list 
-    todo_extractor = create_extractor(
-    model,
-    tools=[ToDo],
-    tool_choice=tool_name,
-    enable_inserts=True
-    ).with_listeners(on_end=spy)
+    # Invoke the extractor with the capture added to this run's callbacks
+    result = todo_extractor.invoke({"messages": updated_messages, "existing": existing_memories},
+                                   config=with_capture(config, capture))
 
-    # Invoke the extractor
-    result = todo_extractor.invoke({"messages": updated_messages, 
-                                         "existing": existing_memories})
-
-    # Save save the memories from Trustcall to the store
-    for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(namespace,
-                  rmeta.get("json_doc_id", str(uuid.uuid4())),
-                  r.model_dump(mode="json"),
-            )
+    # Save the memories from Trustcall to the store in one batch
+    put_batch(store, trustcall_puts(namespace, result))
+    invalidate_memories(config, namespace, state["messages"])
         
     # Respond to the tool call made in task_mAIstro, confirming the update    
     tool_calls = state['messages'][-1].tool_calls
 
     # Extract the changes made by Trustcall and add the the ToolMessage returned to task_mAIstro
-    todo_update_msg = extract_tool_info(spy.called_tools, tool_name)
+    todo_update_msg = extract_tool_info(capture.called_tools, tool_name)
     return {"messages": [{"role": "tool", "content": todo_update_msg, "tool_call_id":tool_calls[0]['id']}]}
 
 def update_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore):
@@ -358,7 +332,9 @@ def update_instructions(state: MessagesState, config: RunnableConfig, store: Bas
     
     namespace = ("instructions", todo_category, user_id)
 
-    existing_memory = store.get(namespace, "user_instructions")
+    # Read the current instructions (usually cached by task_mAIstro)
+    existing_items = load_memories(store, {"instructions": MemoryRequest(namespace)}, config, state["messages"])["instructions"]
+    existing_memory = next((item for item in existing_items if item.key == "user_instructions"), None)
         
     # Format the memory in the system prompt
     system_msg = CREATE_INSTRUCTIONS.format(current_instructions=existing_memory.value if existing_memory else None)
@@ -367,6 +343,7 @@ def update_instructions(state: MessagesState, config: RunnableConfig, store: Bas
     # Overwrite the existing memory in the store 
     key = "user_instructions"
     store.put(namespace, key, {"memory": new_memory.content})
+    invalidate_memories(config, namespace, state["messages"])
     tool_calls = state['messages'][-1].tool_calls
     # Return tool message with update verification
     return {"messages": [{"role": "tool", "content": "updated instructions", "tool_call_id":tool_calls[0]['id']}]}
@@ -406,5 +383,5 @@ builder.add_edge("update_todos", "task_mAIstro")
 builder.add_edge("update_profile", "task_mAIstro")
 builder.add_edge("update_instructions", "task_mAIstro")
 
-# Compile the graph
-graph = builder.compile()
\ No newline at end of file
+# Compile the graph, with a durable SQLite store when MEMORY_STORE_PATH is set
+graph = builder.compile(store=store_from_env())
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""Compact, deterministic rendering of ToDo memories for the task_mAIstro prompt.
+
+The prompt used to embed each item as the repr of its raw dict, in whatever
+order the store returned them. `render_todos` instead writes one short line
+per item:
+
+    - [in progress] Book swim lessons | 30 min | due 2024-11-15 10:00 | Call the YMCA; Check the city pool
+
+Items are ordered by their store key, which never changes (created_at does
+not work: stores reset it when an item is updated). The nodes render the whole
+list, not a relevance-ranked subset, so the rendered list only changes where
+an item changed, was added or was removed. This keeps the prompt prefix
+byte-identical between turns, which is what provider prompt caching keys on.
+Each line is cached per item version (namespace, key, updated_at), so
+unchanged items are not re-rendered on every turn.
+
+With view="open" only the "not started" and "in progress" items are listed;
+done and archived items are folded into one summary line, which bounds the
+prompt for long-lived lists.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
+from langgraph.store.base import Item
+
+# Number of rendered item versions kept
+MAX_CACHED_ITEMS = 4096
+
+CLOSED_STATUSES = ("done", "archived")
+
+def render_item(value: dict) -> str:
+    """One line for a ToDo value; fields that are empty are left out."""
+
+    parts = [f"- [{value.get('status') or 'not started'}] {value.get('task', '').strip()}"]
+    if value.get("time_to_complete"):
+        parts.append(f"{value['time_to_complete']} min")
+    if value.get("deadline"):
+        # ISO timestamps are shortened to the minute
+        parts.append(f"due {str(value['deadline'])[:16].replace('T', ' ')}")
+    if value.get("solutions"):
+        parts.append("; ".join(str(solution).strip() for solution in value["solutions"]))
+    return " | ".join(parts)
+
+def _order(item: Item) -> Tuple:
+    return (tuple(item.namespace), item.key)
+
+class TodoRenderer:
+    """Renders ToDo lists, caching each item's line by its version."""
+
+    def __init__(self, max_items: int = MAX_CACHED_ITEMS):
+        self.max_items = max_items
+        self._lines: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def line(self, item: Item) -> str:
+        version = (tuple(item.namespace), item.key, item.updated_at)
+        with self._lock:
+            line = self._lines.get(version)
+            if line is not None:
+                self._lines.move_to_end(version)
+                self.hits += 1
+                return line
+        line = render_item(item.value)
+        with self._lock:
+            self.misses += 1
+            self._lines[version] = line
+            while len(self._lines) > self.max_items:
+                self._lines.popitem(last=False)
+        return line
+
+    def render(self, items: Iterable[Item], view: str = "all") -> str:
+        items = sorted(items, key=_order)
+        if view != "open":
+            return "\n".join(self.line(item) for item in items)
+
+        lines: List[str] = []
+        closed = {status: 0 for status in CLOSED_STATUSES}
+        for item in items:
+            status = item.value.get("status")
+            if status in closed:
+                closed[status] += 1
+            else:
+                lines.append(self.line(item))
+        if any(closed.values()):
+            counts = ", ".join(f"{count} {status}" for status, count in closed.items() if count)
+            lines.append(f"({counts} not shown)")
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cached": len(self._lines), "hits": self.hits, "misses": self.misses}
+
+todo_renderer = TodoRenderer()
+
+def render_todos(items: Iterable[Item], view: str = "all") -> str:
+    """Render ToDo items for the prompt; view is "all" or "open"."""
+
+    return todo_renderer.render(items, view)